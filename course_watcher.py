@@ -0,0 +1,114 @@
+import os
+import time
+from collections import OrderedDict
+from PySide6.QtCore import QObject, QFileSystemWatcher, QTimer, Signal
+
+
+class CourseWatcher(QObject):
+    """Vigila las carpetas de los cursos y avisa de los cambios agrupados.
+
+    Solo se registran directorios: la raíz de cada curso siempre, y las
+    subcarpetas de los cursos abiertos recientemente mientras quepan en
+    max_directorios. Los eventos se acumulan hasta que hay una pausa de
+    espera_ms (o pasan max_espera_ms) y se emiten en un solo lote.
+    """
+
+    cursos_cambiados = Signal(list)
+
+    def __init__(self, parent=None, max_directorios=4096, espera_ms=800, max_espera_ms=5000):
+        super().__init__(parent)
+        self.max_directorios = max_directorios
+        self.max_espera = max_espera_ms / 1000
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.on_directory_changed)
+        self.raices = {}
+        # Subcarpetas vigiladas por curso, del menos al más reciente
+        self.subdirectorios = OrderedDict()
+        self.cursos_por_ruta = {}
+        self.pendientes = set()
+        self.primer_evento = None
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(espera_ms)
+        self.timer.timeout.connect(self.emitir_cambios)
+
+    def total_vigilados(self):
+        return len(self.raices) + sum(len(rutas) for rutas in self.subdirectorios.values())
+
+    def vigilar_raiz(self, curso_name, ruta):
+        if curso_name in self.raices or not ruta:
+            return
+        if self.total_vigilados() >= self.max_directorios and not self.liberar_subdirectorios():
+            print(f"Límite de carpetas vigiladas alcanzado; {curso_name} no se vigila")
+            return
+        ruta = os.path.normpath(ruta)
+        if self.agregar_rutas(curso_name, [ruta]):
+            self.raices[curso_name] = ruta
+
+    def vigilar_subdirectorios(self, curso_name, manifiesto):
+        # Las carpetas salen del manifiesto del último escaneo del curso
+        raiz = self.raices.get(curso_name)
+        if raiz is None or not manifiesto:
+            return
+        rutas = [os.path.normpath(os.path.join(raiz, relativa))
+                 for relativa in manifiesto if relativa != '.']
+        self.dejar_subdirectorios(curso_name)
+        libres = self.max_directorios - self.total_vigilados()
+        while len(rutas) > libres and self.liberar_subdirectorios():
+            libres = self.max_directorios - self.total_vigilados()
+        self.subdirectorios[curso_name] = self.agregar_rutas(curso_name, rutas[:max(libres, 0)])
+
+    def curso_abierto(self, curso_name, cargar_manifiesto):
+        if curso_name in self.subdirectorios:
+            self.subdirectorios.move_to_end(curso_name)
+        else:
+            self.vigilar_subdirectorios(curso_name, cargar_manifiesto(curso_name))
+
+    def actualizar_curso(self, curso_name, manifiesto):
+        # Tras un reescaneo se vigilan las subcarpetas nuevas si el curso ya las tenía
+        if curso_name in self.subdirectorios:
+            self.vigilar_subdirectorios(curso_name, manifiesto)
+
+    def liberar_subdirectorios(self):
+        if not self.subdirectorios:
+            return False
+        self.dejar_subdirectorios(next(iter(self.subdirectorios)))
+        return True
+
+    def dejar_subdirectorios(self, curso_name):
+        rutas = self.subdirectorios.pop(curso_name, [])
+        if rutas:
+            self.watcher.removePaths(rutas)
+            for ruta in rutas:
+                self.cursos_por_ruta.pop(ruta, None)
+
+    def agregar_rutas(self, curso_name, rutas):
+        rutas = [ruta for ruta in rutas if ruta not in self.cursos_por_ruta]
+        if not rutas:
+            return []
+        fallidas = set(self.watcher.addPaths(rutas))
+        if fallidas:
+            print(f"No se pudieron vigilar {len(fallidas)} carpetas de {curso_name}")
+        agregadas = [ruta for ruta in rutas if ruta not in fallidas]
+        for ruta in agregadas:
+            self.cursos_por_ruta[ruta] = curso_name
+        return agregadas
+
+    def on_directory_changed(self, ruta):
+        curso_name = self.cursos_por_ruta.get(os.path.normpath(ruta))
+        if curso_name is None:
+            return
+        self.pendientes.add(curso_name)
+        ahora = time.monotonic()
+        if self.primer_evento is None:
+            self.primer_evento = ahora
+        # Se reinicia la espera con cada evento, salvo que el lote ya lleve demasiado
+        if ahora - self.primer_evento < self.max_espera or not self.timer.isActive():
+            self.timer.start()
+
+    def emitir_cambios(self):
+        cursos = list(self.pendientes)
+        self.pendientes.clear()
+        self.primer_evento = None
+        if cursos:
+            self.cursos_cambiados.emit(cursos)
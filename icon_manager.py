@@ -1,48 +1,524 @@
 import os
-from PySide6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QScrollArea, QWidget, QGridLayout, QLineEdit
-from PySide6.QtCore import Qt, Signal, QSize
-from PySide6.QtGui import QIcon, QPixmap, QPainter
+import sys
+import json
+import mmap
+import struct
+import bisect
+import hashlib
+from collections import OrderedDict
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QLineEdit, QListView, QStyledItemDelegate, QStyle)
+from PySide6.QtCore import (
+    QByteArray, Qt, Signal, QSize, QObject, QRunnable, QThreadPool, QAbstractListModel, QModelIndex, QTimer, QRect,
+    QAbstractProxyModel)
+from PySide6.QtGui import QIcon, QPixmap, QImage, QPainter, QGuiApplication, QColor
 from PySide6.QtSvg import QSvgRenderer
 
 
-class IconManager:
-    def __init__(self):
+class IconValidationSignals(QObject):
+    finished = Signal(dict)
+
+
+class IconValidationTask(QRunnable):
+    def __init__(self, icons):
+        super().__init__()
+        self.icons = icons
+        self.signals = IconValidationSignals()
+
+    def run(self):
+        results = {}
+        for name, file_path in self.icons.items():
+            try:
+                results[name] = QSvgRenderer(file_path).isValid()
+            except Exception:
+                results[name] = False
+        self.signals.finished.emit(results)
+
+
+def render_svg_image(file_path, size, dpr=1.0, data=None):
+    # Rasteriza a QImage para poder ejecutarse fuera del hilo de la interfaz
+    if data is not None:
+        # PySide6 no puede envolver el mmap sin copiar: se copia solo este icono
+        renderer = QSvgRenderer(QByteArray(bytes(data)))
+    else:
+        renderer = QSvgRenderer(file_path)
+    if not renderer.isValid():
+        return None
+    pixel_size = round(size * dpr)
+    image = QImage(pixel_size, pixel_size, QImage.Format_ARGB32_Premultiplied)
+    image.fill(Qt.transparent)
+    painter = QPainter(image)
+    renderer.render(painter)
+    painter.end()
+    return image
+
+
+class IconRenderSignals(QObject):
+    rendered = Signal(str, int, float, object, QImage)
+    finished = Signal()
+
+
+class IconRenderTask(QRunnable):
+    def __init__(self, jobs, size, dpr):
+        super().__init__()
+        # jobs: lista de (nombre, ruta, datos, mtime, ruta_cache)
+        self.jobs = jobs
+        self.size = size
+        self.dpr = dpr
+        self.signals = IconRenderSignals()
+
+    def run(self):
+        for name, file_path, data, mtime, cache_path in self.jobs:
+            image = QImage(cache_path) if os.path.exists(cache_path) else QImage()
+            if image.isNull():
+                try:
+                    image = render_svg_image(file_path, self.size, self.dpr, data)
+                except Exception as e:
+                    print(f"Error rendering SVG file {file_path}: {str(e)}")
+                    image = None
+                if image is None:
+                    image = QImage()
+                else:
+                    try:
+                        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                        image.save(cache_path, "PNG")
+                    except OSError as e:
+                        print(f"Error guardando icono en cache {cache_path}: {str(e)}")
+            # Se emite icono a icono para que la interfaz los reciba progresivamente
+            self.signals.rendered.emit(name, self.size, self.dpr, mtime, image)
+        self.signals.finished.emit()
+
+
+ARCHIVE_MAGIC = b"CTICONS1"
+ARCHIVE_HEADER = struct.Struct("<8sI")
+
+
+def build_icon_archive(icon_dir="icons", archive_path="icons.pack"):
+    """Empaqueta los iconos de icon_dir en un único archivo: índice JSON + bytes."""
+    index = {}
+    blobs = []
+    offset = 0
+    for root, dirs, files in os.walk(icon_dir):
+        for file in files:
+            if file.endswith(('.svg', '.png')):
+                full_path = os.path.join(root, file)
+                relative_path = os.path.relpath(full_path, icon_dir)
+                name = os.path.splitext(relative_path)[
+                    0].replace(os.path.sep, '/')
+                with open(full_path, "rb") as f:
+                    data = f.read()
+                if file.endswith('.svg'):
+                    valid = QSvgRenderer(QByteArray(data)).isValid()
+                else:
+                    valid = True
+                index[name] = {
+                    "offset": offset,
+                    "length": len(data),
+                    "mtime": os.stat(full_path).st_mtime_ns,
+                    "ext": os.path.splitext(file)[1],
+                    "valid": valid
+                }
+                blobs.append(data)
+                offset += len(data)
+
+    index_bytes = json.dumps(dict(sorted(index.items())), ensure_ascii=False).encode("utf-8")
+    tmp_path = archive_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(ARCHIVE_HEADER.pack(ARCHIVE_MAGIC, len(index_bytes)))
+        f.write(index_bytes)
+        for data in blobs:
+            f.write(data)
+    os.replace(tmp_path, archive_path)
+    return len(index)
+
+
+class IconArchive:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, index_length = ARCHIVE_HEADER.unpack_from(self.mmap, 0)
+        if magic != ARCHIVE_MAGIC:
+            self.mmap.close()
+            raise ValueError(f"{path} no es un archivo de iconos válido")
+        self.data_offset = ARCHIVE_HEADER.size + index_length
+        self.index = json.loads(self.mmap[ARCHIVE_HEADER.size:self.data_offset])
+        self.view = memoryview(self.mmap)
+
+    def get_data(self, name):
+        # Vista sin copia sobre el mmap; solo se leen las páginas de este icono
+        entry = self.index[name]
+        start = self.data_offset + entry["offset"]
+        return self.view[start:start + entry["length"]]
+
+
+class PixmapCache:
+    """LRU de pixmaps por (nombre, tamaño, devicePixelRatio) con límite de bytes."""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        # Tamaños en cache por (nombre, dpr) para reescalar desde uno mayor
+        self.sizes = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.scaled_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def peek(self, name, size, dpr, mtime):
+        entry = self.entries.get((name, size, dpr))
+        if entry is None or entry[0] != mtime:
+            return None
+        self.entries.move_to_end((name, size, dpr))
+        return entry[1]
+
+    def get(self, name, size, dpr, mtime):
+        pixmap = self.peek(name, size, dpr, mtime)
+        if pixmap is not None:
+            self.hits += 1
+            return pixmap
+
+        larger = [s for s in self.sizes.get((name, dpr), ()) if s > size]
+        for cached_size in sorted(larger):
+            source = self.peek(name, cached_size, dpr, mtime)
+            if source is None:
+                continue
+            pixel_size = round(size * dpr)
+            pixmap = source.scaled(pixel_size, pixel_size,
+                                   Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            pixmap.setDevicePixelRatio(dpr)
+            self.scaled_hits += 1
+            self.put(name, size, dpr, mtime, pixmap)
+            return pixmap
+
+        self.misses += 1
+        return None
+
+    def put(self, name, size, dpr, mtime, pixmap):
+        key = (name, size, dpr)
+        self.discard(key)
+        cost = pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+        self.entries[key] = (mtime, pixmap, cost)
+        self.sizes.setdefault((name, dpr), set()).add(size)
+        self.total_bytes += cost
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            self.discard(next(iter(self.entries)))
+            self.evictions += 1
+
+    def discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        self.total_bytes -= entry[2]
+        name, size, dpr = key
+        sizes = self.sizes.get((name, dpr))
+        if sizes is not None:
+            sizes.discard(size)
+            if not sizes:
+                del self.sizes[(name, dpr)]
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "scaled_hits": self.scaled_hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+
+class IconManager(QObject):
+    MANIFEST_VERSION = 1
+    RENDER_CHUNK = 8
+    icons_validated = Signal(list)
+    icon_ready = Signal(str, int, QPixmap)
+
+    def __init__(self, cache_dir="icon_cache", archive_path="icons.pack",
+                 cache_bytes=32 * 1024 * 1024):
+        super().__init__()
         self.icon_dir = "icons"
+        # Si existe el archivo empaquetado se usa en lugar de recorrer icons/
+        self.archive = None
+        if archive_path and os.path.exists(archive_path):
+            try:
+                self.archive = IconArchive(archive_path)
+            except (OSError, ValueError) as e:
+                print(f"No se pudo abrir el archivo de iconos {archive_path}: {str(e)}")
+        # Cache de iconos rasterizados: memoria primero, luego PNG en disco
+        self.cache_dir = cache_dir
+        self.manifest_path = os.path.join(cache_dir, "manifest.json")
         self.icons = {}
+        self.mtimes = {}
+        self.validity = {}
+        self.dirs = {}
+        self.pixmap_cache = PixmapCache(cache_bytes)
+        self.search_index = None
+        self.validation_task = None
+        self.render_tasks = set()
+        self.in_flight = set()
         self.load_icons()
 
     def load_icons(self):
-        for root, dirs, files in os.walk(self.icon_dir):
-            for file in files:
-                if file.endswith(('.svg', '.png')):
-                    full_path = os.path.join(root, file)
-                    relative_path = os.path.relpath(full_path, self.icon_dir)
-                    name = os.path.splitext(relative_path)[
-                        0].replace(os.path.sep, '/')
-                    self.icons[name] = full_path
+        if self.archive is not None:
+            self.load_archive_icons()
+            return
+
+        # Solo se listan las carpetas cuyo mtime cambió desde el último manifiesto
+        manifest = self.load_manifest()
+        old_dirs = manifest.get("dirs", {})
+        old_icons = manifest.get("icons", {})
+        icons = {}
+        changed = False
+        pending = ['.']
+        while pending:
+            rel_dir = pending.pop()
+            directory = os.path.normpath(os.path.join(self.icon_dir, rel_dir))
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                changed = True
+                continue
+
+            old_entry = old_dirs.get(rel_dir)
+            if old_entry and old_entry["mtime"] == mtime:
+                entry = old_entry
+                for name in entry["icons"]:
+                    icons[name] = old_icons[name]
+            else:
+                changed = True
+                entry = self.scan_icon_dir(directory, rel_dir, mtime, old_icons, icons)
+            self.dirs[rel_dir] = entry
+            pending.extend(entry["subdirs"])
+
+        if set(old_dirs) != set(self.dirs):
+            changed = True
+
+        for name in sorted(icons):
+            info = icons[name]
+            self.icons[name] = info["path"]
+            self.mtimes[name] = info["mtime"]
+            self.validity[name] = info["valid"]
+
+        if changed:
+            self.save_manifest()
+
+    def load_archive_icons(self):
+        for name, entry in self.archive.index.items():
+            self.icons[name] = os.path.join(self.archive.path, name + entry["ext"])
+            self.mtimes[name] = entry["mtime"]
+            self.validity[name] = entry["valid"]
+
+    def get_icon_data(self, name):
+        if self.archive is None:
+            return None
+        return self.archive.get_data(name)
+
+    def scan_icon_dir(self, directory, rel_dir, mtime, old_icons, icons):
+        entry = {"mtime": mtime, "subdirs": [], "icons": []}
+        with os.scandir(directory) as it:
+            for item in it:
+                rel_path = os.path.normpath(os.path.join(rel_dir, item.name))
+                if item.is_dir():
+                    entry["subdirs"].append(rel_path)
+                elif item.name.endswith(('.svg', '.png')):
+                    name = os.path.splitext(rel_path)[0].replace(os.path.sep, '/')
+                    file_mtime = item.stat().st_mtime_ns
+                    old_info = old_icons.get(name)
+                    # Solo se conserva la validación si el archivo no cambió
+                    if old_info and old_info["mtime"] == file_mtime:
+                        valid = old_info["valid"]
+                    else:
+                        valid = None if item.name.endswith('.svg') else True
+                    icons[name] = {"path": item.path, "mtime": file_mtime, "valid": valid}
+                    entry["icons"].append(name)
+        return entry
+
+    def load_manifest(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("version") == self.MANIFEST_VERSION:
+                return manifest
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"No se pudo leer el manifiesto de iconos: {str(e)}")
+        return {}
+
+    def save_manifest(self):
+        if self.archive is not None:
+            return
+        manifest = {
+            "version": self.MANIFEST_VERSION,
+            "dirs": self.dirs,
+            "icons": {
+                name: {"path": path, "mtime": self.mtimes[name], "valid": self.validity[name]}
+                for name, path in self.icons.items()
+            }
+        }
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = self.manifest_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False)
+            os.replace(tmp_path, self.manifest_path)
+        except OSError as e:
+            print(f"Error guardando el manifiesto de iconos: {str(e)}")
+
+    def validate_icons_async(self):
+        # Valida en segundo plano solo los iconos nuevos o modificados
+        pending = {name: self.icons[name]
+                   for name, valid in self.validity.items() if valid is None}
+        if not pending or self.validation_task is not None:
+            return
+        self.validation_task = IconValidationTask(pending)
+        self.validation_task.signals.finished.connect(self.on_icons_validated)
+        QThreadPool.globalInstance().start(self.validation_task)
+
+    def on_icons_validated(self, results):
+        self.validation_task = None
+        for name, valid in results.items():
+            if name in self.validity:
+                self.validity[name] = valid
+        self.save_manifest()
+        problematic_icons = [name for name, valid in results.items() if not valid]
+        self.icons_validated.emit(problematic_icons)
+        self.report_problematic_icons()
 
     def get_icon(self, name, size=50):
-        if name in self.icons:
+        if name in self.icons and self.validity.get(name) is not False:
             file_path = self.icons[name]
             if file_path.endswith('.svg'):
-                try:
-                    renderer = QSvgRenderer(file_path)
-                    if not renderer.isValid():
-                        print(f"Warning: Invalid SVG file: {file_path}")
-                        return self.get_fallback_icon(size)
-                    pixmap = QPixmap(size, size)
-                    pixmap.fill(Qt.transparent)
-                    painter = QPainter(pixmap)
-                    renderer.render(painter)
-                    painter.end()
-                    return QIcon(pixmap)
-                except Exception as e:
-                    print(f"Error rendering SVG file {file_path}: {str(e)}")
+                pixmap = self.get_pixmap(name, size)
+                if pixmap is None:
                     return self.get_fallback_icon(size)
+                return QIcon(pixmap)
+            elif self.archive is not None:
+                pixmap = QPixmap()
+                pixmap.loadFromData(bytes(self.get_icon_data(name)))
+                return QIcon(pixmap)
             else:
                 return QIcon(file_path)
         return self.get_fallback_icon(size)
 
+    def get_pixmap(self, name, size, dpr=None):
+        if dpr is None:
+            dpr = self.device_pixel_ratio()
+        mtime = self.get_mtime(name)
+        pixmap = self.pixmap_cache.get(name, size, dpr, mtime)
+        if pixmap is not None:
+            return pixmap
+
+        key = (name, size, dpr, mtime)
+        cache_path = self.get_cache_path(key)
+        if os.path.exists(cache_path):
+            pixmap = QPixmap(cache_path)
+            if not pixmap.isNull():
+                pixmap.setDevicePixelRatio(dpr)
+                self.pixmap_cache.put(name, size, dpr, mtime, pixmap)
+                return pixmap
+
+        pixmap = self.render_svg(self.icons[name], size, dpr, self.get_icon_data(name))
+        if pixmap is None:
+            self.validity[name] = False
+            return None
+        self.pixmap_cache.put(name, size, dpr, mtime, pixmap)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            pixmap.save(cache_path, "PNG")
+        except OSError as e:
+            print(f"Error guardando icono en cache {cache_path}: {str(e)}")
+        return pixmap
+
+    def peek_pixmap(self, name, size, dpr=None):
+        # Solo consulta la cache en memoria, nunca renderiza
+        if dpr is None:
+            dpr = self.device_pixel_ratio()
+        return self.pixmap_cache.peek(name, size, dpr, self.get_mtime(name))
+
+    def render_svg(self, file_path, size, dpr=1.0, data=None):
+        try:
+            image = render_svg_image(file_path, size, dpr, data)
+            if image is None:
+                print(f"Warning: Invalid SVG file: {file_path}")
+                return None
+            pixmap = QPixmap.fromImage(image)
+            pixmap.setDevicePixelRatio(dpr)
+            return pixmap
+        except Exception as e:
+            print(f"Error rendering SVG file {file_path}: {str(e)}")
+            return None
+
+    def request_icons(self, names, size, dpr=None):
+        """Pide varios iconos a la vez.
+
+        Devuelve los que ya están en memoria; el resto se rasteriza en el
+        QThreadPool y llega por la señal icon_ready a medida que termina.
+        """
+        if dpr is None:
+            dpr = self.device_pixel_ratio()
+        ready = {}
+        jobs = []
+        for name in dict.fromkeys(names):
+            if name not in self.icons or self.validity.get(name) is False:
+                continue
+            mtime = self.get_mtime(name)
+            pixmap = self.pixmap_cache.get(name, size, dpr, mtime)
+            if pixmap is not None:
+                ready[name] = pixmap
+                continue
+            if not self.icons[name].endswith('.svg'):
+                # Los PNG no se rasterizan, pero se guardan para que peek_pixmap los encuentre
+                pixmap = self.get_icon(name, size).pixmap(size, size)
+                self.pixmap_cache.put(name, size, dpr, mtime, pixmap)
+                ready[name] = pixmap
+                continue
+            if (name, size, dpr) in self.in_flight:
+                continue
+            self.in_flight.add((name, size, dpr))
+            data = self.get_icon_data(name)
+            jobs.append((name, self.icons[name], bytes(data) if data is not None else None,
+                         mtime, self.get_cache_path((name, size, dpr, mtime))))
+
+        pool = QThreadPool.globalInstance()
+        for i in range(0, len(jobs), self.RENDER_CHUNK):
+            task = IconRenderTask(jobs[i:i + self.RENDER_CHUNK], size, dpr)
+            task.signals.rendered.connect(self.on_icon_rendered)
+            task.signals.finished.connect(
+                lambda task=task: self.render_tasks.discard(task))
+            self.render_tasks.add(task)
+            pool.start(task)
+        return ready
+
+    def on_icon_rendered(self, name, size, dpr, mtime, image):
+        self.in_flight.discard((name, size, dpr))
+        if image.isNull():
+            self.validity[name] = False
+            pixmap = self.get_fallback_icon(size).pixmap(size, size)
+        else:
+            # Los QPixmap solo pueden crearse en el hilo de la interfaz
+            pixmap = QPixmap.fromImage(image)
+            pixmap.setDevicePixelRatio(dpr)
+            if mtime == self.get_mtime(name):
+                self.pixmap_cache.put(name, size, dpr, mtime, pixmap)
+        self.icon_ready.emit(name, size, pixmap)
+
+    def get_mtime(self, name):
+        return self.mtimes.get(name, 0)
+
+    def get_cache_path(self, key):
+        name, size, dpr, mtime = key
+        digest = hashlib.sha1(
+            f"{name}|{size}|{dpr}|{mtime}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.png")
+
+    def device_pixel_ratio(self):
+        app = QGuiApplication.instance()
+        return app.devicePixelRatio() if app else 1.0
+
     def get_fallback_icon(self, size):
         pixmap = QPixmap(size, size)
         pixmap.fill(Qt.gray)
@@ -59,16 +535,15 @@ class IconManager:
                 categories.add(parts[0])
         return list(categories)
 
+    def get_search_index(self):
+        if self.search_index is None:
+            self.search_index = IconSearchIndex(
+                self.get_icon_names(), self.get_categories())
+        return self.search_index
+
     def report_problematic_icons(self):
-        problematic_icons = []
-        for name, file_path in self.icons.items():
-            if file_path.endswith('.svg'):
-                try:
-                    renderer = QSvgRenderer(file_path)
-                    if not renderer.isValid():
-                        problematic_icons.append(name)
-                except Exception:
-                    problematic_icons.append(name)
+        problematic_icons = [name for name, valid in self.validity.items()
+                             if valid is False]
 
         if problematic_icons:
             print("The following icons have rendering issues:")
@@ -78,7 +553,202 @@ class IconManager:
             print("No problematic icons found.")
 
 
+class IconSearchIndex:
+    # Rango de coincidencia: menor es mejor
+    RANK_CATEGORY = 0
+    RANK_PREFIX = 1
+    RANK_SUBSTRING = 2
+
+    def __init__(self, names, categories=()):
+        self.names = list(names)
+        self.lowered = [name.lower() for name in self.names]
+        self.categories = {}
+        self.trigrams = {}
+        tokens = {}
+        for row, name in enumerate(self.lowered):
+            parts = name.split('/')
+            if len(parts) > 1:
+                self.categories.setdefault(parts[0], []).append(row)
+            for token in name.replace('/', '-').replace('_', '-').split('-'):
+                if token:
+                    tokens.setdefault(token, set()).add(row)
+            for i in range(len(name) - 2):
+                self.trigrams.setdefault(name[i:i + 3], set()).add(row)
+        # Solo se indexan las categorías que conoce el IconManager
+        known = {category.lower() for category in categories}
+        self.categories = {category: rows for category, rows in self.categories.items()
+                           if category in known}
+        self.token_list = sorted(tokens)
+        self.token_rows = [tokens[token] for token in self.token_list]
+
+    def search(self, query):
+        """Devuelve {fila: rango} para los iconos que contienen la búsqueda."""
+        query = query.strip().lower()
+        if not query:
+            return None
+
+        ranks = {}
+        for row in self.categories.get(query, ()):
+            ranks[row] = self.RANK_CATEGORY
+
+        start = bisect.bisect_left(self.token_list, query)
+        end = bisect.bisect_left(self.token_list, query + '\uffff')
+        for rows in self.token_rows[start:end]:
+            for row in rows:
+                ranks.setdefault(row, self.RANK_PREFIX)
+
+        for row in self.substring_candidates(query):
+            if query in self.lowered[row]:
+                ranks.setdefault(row, self.RANK_SUBSTRING)
+        return ranks
+
+    def substring_candidates(self, query):
+        if len(query) < 3:
+            return range(len(self.lowered))
+        candidates = None
+        for i in range(len(query) - 2):
+            rows = self.trigrams.get(query[i:i + 3])
+            if not rows:
+                return ()
+            candidates = rows if candidates is None else candidates & rows
+        return candidates
+
+
+class IconFilterProxyModel(QAbstractProxyModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Filas del modelo fuente en el orden en que se muestran
+        self.rows = []
+        self.positions = {}
+
+    def setSourceModel(self, source_model):
+        super().setSourceModel(source_model)
+        source_model.dataChanged.connect(self.on_source_data_changed)
+        self.set_ranks(None)
+
+    def set_ranks(self, ranks):
+        self.beginResetModel()
+        if ranks is None:
+            self.rows = list(range(self.sourceModel().rowCount()))
+        else:
+            self.rows = sorted(ranks, key=lambda row: (ranks[row], row))
+        self.positions = {row: position for position, row in enumerate(self.rows)}
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 1
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or column != 0 or not 0 <= row < len(self.rows):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=QModelIndex()):
+        return QModelIndex()
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid():
+            return QModelIndex()
+        return self.sourceModel().index(self.rows[proxy_index.row()], 0)
+
+    def mapFromSource(self, source_index):
+        position = self.positions.get(source_index.row()) if source_index.isValid() else None
+        if position is None:
+            return QModelIndex()
+        return self.index(position, 0)
+
+    def on_source_data_changed(self, top_left, bottom_right, roles=()):
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            index = self.mapFromSource(self.sourceModel().index(row, 0))
+            if index.isValid():
+                self.dataChanged.emit(index, index, roles)
+
+
+class IconListModel(QAbstractListModel):
+    def __init__(self, icon_manager, names, icon_size=50, parent=None):
+        super().__init__(parent)
+        self.icon_manager = icon_manager
+        self.names = names
+        self.icon_size = icon_size
+        self.rows = {name: row for row, name in enumerate(names)}
+        self.fallback_pixmap = icon_manager.get_fallback_icon(icon_size).pixmap(icon_size)
+        # Iconos visibles pendientes de pedir al IconManager en un solo lote
+        self.pending = set()
+        self.request_timer = QTimer(self)
+        self.request_timer.setSingleShot(True)
+        self.request_timer.timeout.connect(self.request_pending)
+        icon_manager.icon_ready.connect(self.on_icon_ready)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.names)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        name = self.names[index.row()]
+        if role in (Qt.ToolTipRole, Qt.UserRole):
+            return name
+        if role == Qt.DecorationRole:
+            if self.icon_manager.validity.get(name) is False:
+                return self.fallback_pixmap
+            pixmap = self.icon_manager.peek_pixmap(name, self.icon_size)
+            if pixmap is None:
+                self.pending.add(name)
+                self.request_timer.start(0)
+            return pixmap
+        return None
+
+    def request_pending(self):
+        pending = list(self.pending)
+        self.pending.clear()
+        ready = self.icon_manager.request_icons(pending, self.icon_size)
+        for name in ready:
+            self.on_icon_ready(name, self.icon_size, ready[name])
+
+    def on_icon_ready(self, name, size, pixmap):
+        row = self.rows.get(name)
+        if size != self.icon_size or row is None:
+            return
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+
+class IconItemDelegate(QStyledItemDelegate):
+    def __init__(self, cell_size=60, icon_size=50, parent=None):
+        super().__init__(parent)
+        self.cell_size = cell_size
+        self.icon_size = icon_size
+
+    def sizeHint(self, option, index):
+        return QSize(self.cell_size, self.cell_size)
+
+    def paint(self, painter, option, index):
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        cell = option.rect.adjusted(2, 2, -2, -2)
+        if option.state & QStyle.State_MouseOver:
+            painter.setPen(QColor("#2596be"))
+            painter.setBrush(QColor("#e0f0f7"))
+            painter.drawRoundedRect(cell, 5, 5)
+
+        icon_rect = QRect(0, 0, self.icon_size, self.icon_size)
+        icon_rect.moveCenter(option.rect.center())
+        pixmap = index.data(Qt.DecorationRole)
+        if pixmap is None:
+            # Marcador mientras el icono se renderiza
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QColor("#e5e7eb"))
+            painter.drawRoundedRect(icon_rect, 5, 5)
+        else:
+            painter.drawPixmap(icon_rect, pixmap)
+        painter.restore()
+
+
 class IconSelectorDialog(QDialog):
+    SEARCH_DELAY_MS = 150
     icon_selected = Signal(str)
 
     def __init__(self, icon_manager, parent=None):
@@ -98,15 +768,26 @@ class IconSelectorDialog(QDialog):
             "QLineEdit { font-size: 12px; color: #000000; border: 1px solid #2596be; border-radius: 5px; padding-left: 10px;}")
         self.search_bar.setFixedHeight(30)
         self.search_bar.setPlaceholderText("Buscar icono...")
-        self.search_bar.textChanged.connect(self.filter_icons)
         layout.addWidget(self.search_bar)
 
-        self.scroll_area = QScrollArea()
-        self.scroll_content = QWidget()
-        self.grid_layout = QGridLayout(self.scroll_content)
-        self.scroll_area.setWidget(self.scroll_content)
-        self.scroll_area.setWidgetResizable(True)
-        layout.addWidget(self.scroll_area)
+        # Solo se filtra cuando el usuario deja de escribir
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(self.SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self.filter_icons)
+        self.search_bar.textChanged.connect(self.search_timer.start)
+
+        self.icon_view = QListView()
+        self.icon_view.setFlow(QListView.LeftToRight)
+        self.icon_view.setWrapping(True)
+        self.icon_view.setResizeMode(QListView.Adjust)
+        self.icon_view.setMovement(QListView.Static)
+        self.icon_view.setUniformItemSizes(True)
+        self.icon_view.setMouseTracking(True)
+        self.icon_view.setItemDelegate(IconItemDelegate(parent=self.icon_view))
+        self.icon_view.clicked.connect(
+            lambda index: self.on_icon_selected(index.data(Qt.UserRole)))
+        layout.addWidget(self.icon_view)
 
         button_layout = QHBoxLayout()
         cancel_button = QPushButton("Cancelar")
@@ -123,39 +804,27 @@ class IconSelectorDialog(QDialog):
         self.load_all_icons()
 
     def load_all_icons(self):
-        icons = self.icon_manager.get_icon_names()
-        for i, icon_name in enumerate(icons):
-            icon = self.icon_manager.get_icon(icon_name, size=50)
-            button = QPushButton()
-            button.setIcon(icon)
-            button.setFixedSize(60, 60)
-            button.setIconSize(QSize(50, 50))
-            button.setToolTip(icon_name)
-            button.clicked.connect(
-                lambda _, name=icon_name: self.on_icon_selected(name))
-            self.grid_layout.addWidget(button, i // 5, i % 5)
+        # El modelo solo guarda nombres; la vista pide los iconos visibles
+        self.icon_model = IconListModel(
+            self.icon_manager, self.icon_manager.get_icon_names(), 50, self)
+        self.proxy_model = IconFilterProxyModel(self)
+        self.proxy_model.setSourceModel(self.icon_model)
+        self.icon_view.setModel(self.proxy_model)
 
     def filter_icons(self):
-        search_text = self.search_bar.text().lower()
-        visible_widgets = []
-
-        for i in range(self.grid_layout.count()):
-            widget = self.grid_layout.itemAt(i).widget()
-            if widget:
-                icon_name = widget.toolTip().lower()
-                is_visible = search_text in icon_name
-                widget.setVisible(is_visible)
-                if is_visible:
-                    visible_widgets.append(widget)
-
-        # Reorganizar los widgets visibles
-        for i, widget in enumerate(visible_widgets):
-            self.grid_layout.removeWidget(widget)
-            self.grid_layout.addWidget(widget, i // 5, i % 5)
-
-        self.scroll_content.adjustSize()
-        self.scroll_area.setWidgetResizable(True)
+        ranks = self.icon_manager.get_search_index().search(self.search_bar.text())
+        self.proxy_model.set_ranks(ranks)
+        self.icon_view.scrollToTop()
 
     def on_icon_selected(self, icon_name):
         self.icon_selected.emit(icon_name)
         self.accept()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--build-archive":
+        archive_path = sys.argv[2] if len(sys.argv) > 2 else "icons.pack"
+        total = build_icon_archive("icons", archive_path)
+        print(f"{total} iconos empaquetados en {archive_path}")
+    else:
+        print("Uso: python icon_manager.py --build-archive [icons.pack]")
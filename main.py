@@ -1,17 +1,22 @@
 import os
-import json
-import re
+from collections import OrderedDict
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QFileDialog,
     QLabel, QStackedWidget, QScrollArea, QGridLayout,
-    QProgressBar, QTreeWidget, QTreeWidgetItem, QTextBrowser, QSizePolicy, QMessageBox, QSlider, QCheckBox, QSplitter)
-from PySide6.QtCore import Qt, QSize, QUrl, QDir, Signal, QTimer
+    QProgressBar, QTreeWidget, QTreeWidgetItem, QTextBrowser, QSizePolicy, QMessageBox, QSlider, QCheckBox, QSplitter,
+    QProgressDialog, QStyle)
+from PySide6.QtCore import Qt, QSize, QUrl, QDir, Signal, QTimer, QThreadPool, QEvent, QPoint
 from PySide6.QtGui import QIcon, QDesktopServices, QFontMetrics
 from PySide6.QtWebEngineWidgets import QWebEngineView
 from PySide6.QtWebEngineCore import QWebEnginePage
 from PySide6.QtMultimedia import QMediaPlayer, QAudioOutput
 from PySide6.QtMultimediaWidgets import QVideoWidget
 from icon_manager import IconManager, IconSelectorDialog
+from storage import crear_storage
+from scanner import archivos_modificados, huellas_por_clave, ScanTask, LibraryScanTask
+from course_watcher import CourseWatcher
+from media_probe import DurationProber, formatear_duracion
+from thumbnails import ThumbnailManager
 
 
 class EmptyCourseWidget(QWidget):
@@ -79,6 +84,12 @@ class VideoItemWidget(QWidget):
         self.checkbox.clicked.connect(self.on_checkbox_clicked)
         top_layout.addWidget(self.checkbox)
 
+        # Carátula del video; llega desde el pipeline de miniaturas
+        self.thumb_label = QLabel()
+        self.thumb_label.setFixedSize(64, 36)
+        self.thumb_label.setStyleSheet("background-color: #384052; margin-left: 8px;")
+        top_layout.addWidget(self.thumb_label)
+
         self.nombre_label = QLabel(archivo['nombre'])
         self.nombre_label.setWordWrap(True)
         self.nombre_label.setSizePolicy(
@@ -108,20 +119,22 @@ class VideoItemWidget(QWidget):
         self.curso_tracker = curso_tracker
 
         self.load_progress()
+        self.load_thumbnail()
+
+    def load_thumbnail(self):
+        ruta = self.curso_tracker.ruta_archivo(self.curso_name, self.archivo)
+        pixmap = self.curso_tracker.thumbnails.poster(ruta)
+        if pixmap is not None:
+            self.thumb_label.setPixmap(pixmap.scaled(
+                self.thumb_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
 
     def update_progress(self, progress):
         self.progress_bar.setValue(int(progress))
 
     def load_progress(self):
-        ruta_curso = self.curso_tracker.cursos_data[self.curso_name]['ruta']
-        seccion = self.archivo.get('seccion', 'Principal')
-        ruta_archivo = os.path.join(
-            ruta_curso, seccion, self.archivo['nombre'])
-        ruta_archivo = os.path.normpath(ruta_archivo)  # Normalizar la ruta
-
         progress = self.curso_tracker.load_video_progress(
-            self.curso_name, ruta_archivo)
-        # print(f"Cargando progreso para: {ruta_archivo}")
+            self.curso_name, self.archivo['id'])
+        # print(f"Cargando progreso para: {self.archivo['id']}")
         # print(f"Progreso encontrado: {progress}")
 
         if progress:
@@ -259,7 +272,9 @@ class CursoCard(QWidget):
         super().__init__()
         self.curso = curso
         self.icon_manager = icon_manager
+        self.icon_name = None
         self.setCursor(Qt.PointingHandCursor)
+        self.icon_manager.icon_ready.connect(self.on_icon_ready)
         self.setup_ui()
 
     def setup_ui(self):
@@ -282,6 +297,7 @@ class CursoCard(QWidget):
 
         # Icono
         self.icon_label = QLabel()
+        self.icon_label.setFixedSize(50, 50)
         self.update_icon(self.curso['icon'])
         container_layout.addWidget(self.icon_label, alignment=Qt.AlignCenter)
 
@@ -293,18 +309,22 @@ class CursoCard(QWidget):
         container_layout.addWidget(name_label)
 
         self.progress_bar = QProgressBar()
-        self.progress_bar.setRange(0, self.curso['totalArchivos'])
-        self.progress_bar.setValue(self.curso['archivosVistos'])
         self.progress_bar.setTextVisible(False)
         layout.addWidget(self.progress_bar)
 
         container_layout.addWidget(self.progress_bar)
 
         # Etiqueta de progreso
-        progress_label = QLabel(
-            f"{self.curso['archivosVistos']} / {self.curso['totalArchivos']} videos vistos")
-        progress_label.setAlignment(Qt.AlignCenter)
-        container_layout.addWidget(progress_label)
+        self.progress_label = QLabel()
+        self.progress_label.setAlignment(Qt.AlignCenter)
+        container_layout.addWidget(self.progress_label)
+
+        # Tiempo restante, cuando ya se conocen las duraciones de los videos
+        self.tiempo_label = QLabel()
+        self.tiempo_label.setAlignment(Qt.AlignCenter)
+        self.tiempo_label.setStyleSheet("font-size: 12px; color: #666;")
+        container_layout.addWidget(self.tiempo_label)
+        self.actualizar_progreso()
 
         # Botón para cambiar icono
         change_icon_button = QPushButton("Cambiar icono")
@@ -339,13 +359,36 @@ class CursoCard(QWidget):
         """)
 
     def actualizar_progreso(self):
-        self.progress_bar.setValue(self.curso['archivosVistos'])
+        duracion_total = self.curso.get('duracionTotal')
+        if duracion_total:
+            # Con duraciones la barra avanza por tiempo visto, no por número de lecciones
+            self.progress_bar.setRange(0, 1000)
+            self.progress_bar.setValue(self.curso['duracionVista'] * 1000 // duracion_total)
+            restante = duracion_total - self.curso['duracionVista']
+            self.tiempo_label.setText(
+                f"Quedan {formatear_duracion(restante)}" if restante > 0 else "Completado")
+        else:
+            self.progress_bar.setRange(0, self.curso['totalArchivos'])
+            self.progress_bar.setValue(self.curso['archivosVistos'])
+            self.tiempo_label.clear()
         self.progress_label.setText(
             f"{self.curso['archivosVistos']} / {self.curso['totalArchivos']} videos vistos")
 
     def update_icon(self, icon_name):
-        icon = self.icon_manager.get_icon(icon_name, size=50)
-        self.icon_label.setPixmap(icon.pixmap(50, 50))
+        # El icono se rasteriza en segundo plano y llega por icon_ready
+        self.icon_name = icon_name
+        ready = self.icon_manager.request_icons([icon_name], size=50)
+        if icon_name in ready:
+            self.icon_label.setPixmap(ready[icon_name])
+        elif icon_name not in self.icon_manager.icons or self.icon_manager.validity.get(icon_name) is False:
+            icon = self.icon_manager.get_fallback_icon(50)
+            self.icon_label.setPixmap(icon.pixmap(50, 50))
+        else:
+            self.icon_label.clear()
+
+    def on_icon_ready(self, icon_name, size, pixmap):
+        if icon_name == self.icon_name and size == 50:
+            self.icon_label.setPixmap(pixmap)
 
     def change_icon(self):
         dialog = IconSelectorDialog(self.icon_manager, self)
@@ -364,6 +407,7 @@ class CustomVideoWidget(QWidget):
         super().__init__(parent)
         self.curso_tracker = curso_tracker
         self.current_video_path = None
+        self.current_video_key = None
         self.curso_name = None
         self.last_position = 0  # Añadimos esta variable para almacenar la última posición
         self.end_of_media_processed = False
@@ -416,8 +460,14 @@ class CustomVideoWidget(QWidget):
 
         self.position_slider = QSlider(Qt.Horizontal)
         self.position_slider.sliderMoved.connect(self.set_position)
+        self.position_slider.setMouseTracking(True)
+        self.position_slider.installEventFilter(self)
         controls_layout.addWidget(self.position_slider, 1)
 
+        # Vista previa al pasar el ratón por la barra de posición
+        self.preview_label = QLabel(self, Qt.ToolTip)
+        self.preview_label.hide()
+
         self.duration_label = QLabel("00:00 / 00:00")
         controls_layout.addWidget(self.duration_label)
 
@@ -477,7 +527,7 @@ class CustomVideoWidget(QWidget):
                 progress = (self.last_position /
                             self.media_player.duration()) * 100
                 self.progress_updated.emit(
-                    self.curso_name, self.current_video_path, progress)
+                    self.curso_name, self.current_video_key, progress)
         else:
             self.media_player.setPosition(self.last_position)
             self.media_player.play()
@@ -506,7 +556,7 @@ class CustomVideoWidget(QWidget):
         if self.media_player.duration() > 0:
             progress = (position / self.media_player.duration()) * 100
             self.progress_updated.emit(
-                self.curso_name, self.current_video_path, progress)
+                self.curso_name, self.current_video_key, progress)
 
     def set_position(self, position):
         self.media_player.setPosition(position)
@@ -543,7 +593,11 @@ class CustomVideoWidget(QWidget):
         # Establecer la nueva fuente
         self.current_video_path = new_video_path
         self.curso_name = curso_name
+        self.current_video_key = self.curso_tracker.clave_desde_ruta(
+            curso_name, new_video_path)
         self.media_player.setSource(url)
+        self.preview_label.hide()
+        self.curso_tracker.thumbnails.request(new_video_path, con_sprite=True)
 
         # Cargar el progreso del nuevo video
         self.load_progress()
@@ -551,6 +605,30 @@ class CustomVideoWidget(QWidget):
         # Actualizar la interfaz
         self.update_ui()
 
+    def eventFilter(self, obj, event):
+        if obj is self.position_slider:
+            if event.type() == QEvent.MouseMove:
+                self.mostrar_preview(int(event.position().x()))
+            elif event.type() == QEvent.Leave:
+                self.preview_label.hide()
+        return super().eventFilter(obj, event)
+
+    def mostrar_preview(self, x):
+        slider = self.position_slider
+        if not self.current_video_path or slider.maximum() <= 0:
+            return
+        posicion = QStyle.sliderValueFromPosition(
+            slider.minimum(), slider.maximum(), x, slider.width())
+        pixmap = self.curso_tracker.thumbnails.preview(self.current_video_path, posicion)
+        if pixmap is None:
+            self.preview_label.hide()
+            return
+        self.preview_label.setPixmap(pixmap)
+        self.preview_label.adjustSize()
+        punto = slider.mapToGlobal(QPoint(x, 0))
+        self.preview_label.move(punto.x() - pixmap.width() // 2, punto.y() - pixmap.height() - 8)
+        self.preview_label.show()
+
     def save_current_progress(self):
         if self.current_video_path and self.curso_name:
             progress = {
@@ -558,7 +636,7 @@ class CustomVideoWidget(QWidget):
                 "duration": self.media_player.duration()
             }
             self.curso_tracker.save_video_progress(
-                self.curso_name, self.current_video_path, progress)
+                self.curso_name, self.current_video_key, progress)
             print(f"Progreso guardado para {self.current_video_path}: {
                   self.format_time(self.last_position)}")
 
@@ -576,7 +654,7 @@ class CustomVideoWidget(QWidget):
         if duration > 0:
             progress = (current_position / duration) * 100
             self.progress_updated.emit(
-                self.curso_name, self.current_video_path, progress)
+                self.curso_name, self.current_video_key, progress)
 
     def update_ui_with_progress(self, progress):
         if progress:
@@ -592,17 +670,17 @@ class CustomVideoWidget(QWidget):
             if duration > 0:
                 progress_percentage = (position / duration) * 100
                 self.progress_updated.emit(
-                    self.curso_name, self.current_video_path, progress_percentage)
+                    self.curso_name, self.current_video_key, progress_percentage)
         else:
             self.position_slider.setValue(0)
             self.update_duration_label()
             self.progress_updated.emit(
-                self.curso_name, self.current_video_path, 0)
+                self.curso_name, self.current_video_key, 0)
 
     def load_progress(self):
         if self.current_video_path and self.curso_name:
             progress = self.curso_tracker.load_video_progress(
-                self.curso_name, self.current_video_path)
+                self.curso_name, self.current_video_key)
             if progress:
                 self.last_position = progress.get("position", 0)
                 self.position_slider.setValue(self.last_position)
@@ -630,10 +708,10 @@ class CustomVideoWidget(QWidget):
             print(f"Curso actual: {self.curso_name}")
             if self.curso_name and self.current_video_path:
                 self.curso_tracker.marcar_video_como_visto(
-                    self.curso_name, self.current_video_path)
+                    self.curso_name, self.current_video_key)
                 # Emitir señal para marcar el checkbox como visto
                 self.curso_tracker.marcar_archivo_como_visto(
-                    self.current_video_path)
+                    self.current_video_key)
             else:
                 print("Error: curso_name o current_video_path no están definidos")
             print("Video terminado, marcado como visto y progreso guardado al final")
@@ -644,6 +722,8 @@ class CustomVideoWidget(QWidget):
 
 
 class CursoTracker(QMainWindow):
+    MAX_LECCIONES_EN_MEMORIA = 20000
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Seguimiento de Cursos")
@@ -653,7 +733,8 @@ class CursoTracker(QMainWindow):
         self.empty_course_widget = EmptyCourseWidget(self)
         self.empty_course_widget.hide()
         self.icon_manager = IconManager()
-        self.icon_manager.report_problematic_icons()
+        # Validar iconos nuevos o modificados sin retrasar el primer frame
+        QTimer.singleShot(0, self.icon_manager.validate_icons_async)
 
         self.setStyleSheet("""
             QMainWindow, QWidget {
@@ -689,6 +770,35 @@ class CursoTracker(QMainWindow):
         self.stacked_widget = QStackedWidget()
         self.layout.addWidget(self.stacked_widget)
 
+        self.storage = crear_storage(window_ms=500)
+        self.indices_archivos = {}
+        self.widgets_archivos = {}
+        # Árboles de lecciones en memoria (curso -> lecciones), del menos al más reciente
+        self.arboles_cargados = OrderedDict()
+        self.grid_pendiente = False
+        # Las tarjetas se crean una vez por curso y se reacomodan al cambiar las columnas
+        self.tarjetas = {}
+        self.orden_grid = None
+        self.grid_timer = QTimer(self)
+        self.grid_timer.setSingleShot(True)
+        self.grid_timer.timeout.connect(self.actualizar_grid_cursos)
+
+        self.importaciones = {}
+        # Reescaneos en curso y cursos que cambiaron otra vez mientras tanto
+        self.reescaneos = {}
+        self.reescaneos_repetir = set()
+        # Duraciones en ms por curso y clave de lección, una vez sondeadas
+        self.duraciones = {}
+        self.duraciones_pendientes = []
+        self.sondeo_en_fondo = None
+        self.duration_prober = DurationProber(self)
+        self.duration_prober.durations_ready.connect(self.on_duraciones_listas)
+        self.importacion_biblioteca = None
+        self.thumbnails = ThumbnailManager(self)
+        self.thumbnails.thumbnail_ready.connect(self.on_thumbnail_ready)
+        self.course_watcher = CourseWatcher(self)
+        self.course_watcher.cursos_cambiados.connect(self.aplicar_cambios_en_disco)
+
         self.video_widget = CustomVideoWidget(curso_tracker=self)
         self.video_widget.progress_updated.connect(self.update_video_progress)
 
@@ -697,6 +807,11 @@ class CursoTracker(QMainWindow):
         self.load_progress_data()
         self.btn_volver_inicio.hide()
 
+        # Los cursos sin duración se sondean de a uno tras el arranque
+        self.duraciones_pendientes = [
+            curso_name for curso_name, curso in self.cursos_data.items() if 'duracionTotal' not in curso]
+        QTimer.singleShot(1000, self.sondear_siguiente_pendiente)
+
     def setup_ui(self):
         # Página principal de cursos
         self.cursos_page = QWidget()
@@ -713,7 +828,13 @@ class CursoTracker(QMainWindow):
         self.btn_agregar_carpeta.setFixedWidth(200)
         self.btn_agregar_carpeta.setCursor(Qt.PointingHandCursor)
 
+        self.btn_importar_biblioteca = QPushButton("Importar Biblioteca")
+        self.btn_importar_biblioteca.clicked.connect(self.importar_biblioteca)
+        self.btn_importar_biblioteca.setFixedWidth(200)
+        self.btn_importar_biblioteca.setCursor(Qt.PointingHandCursor)
+
         layout_title.addWidget(titulo)
+        layout_title.addWidget(self.btn_importar_biblioteca)
         layout_title.addWidget(self.btn_agregar_carpeta)
 
         cursos_layout.addLayout(layout_title)
@@ -753,12 +874,16 @@ class CursoTracker(QMainWindow):
         self.tree_widget.setHeaderHidden(True)
         self.tree_widget.setWordWrap(True)
         self.tree_widget.itemClicked.connect(self.mostrar_archivo)
+        self.tree_widget.itemSelectionChanged.connect(self.on_item_selection_changed)
         self.tree_widget.setStyleSheet("QTreeWidget::item { height: 30px; }")
         tree_layout.addWidget(self.tree_widget)
         # Crear el botón "Volver al Inicio"
         self.btn_volver_inicio = QPushButton("Volver al Inicio")
         self.btn_volver_inicio.setCursor(Qt.PointingHandCursor)
         self.btn_volver_inicio.clicked.connect(self.volver_al_inicio)
+        self.btn_reescanear = QPushButton("Buscar lecciones nuevas")
+        self.btn_reescanear.setCursor(Qt.PointingHandCursor)
+        self.btn_reescanear.clicked.connect(self.reescanear_curso_actual)
 
         tree_layout.addWidget(self.tree_widget)
 
@@ -781,6 +906,7 @@ class CursoTracker(QMainWindow):
         self.content_area.addWidget(self.curso_info_widget)
 
         tree_layout.addWidget(self.tree_widget)
+        tree_layout.addWidget(self.btn_reescanear)
         tree_layout.addWidget(self.btn_volver_inicio)
 
         right_container = QWidget()
@@ -843,211 +969,459 @@ class CursoTracker(QMainWindow):
 
         return widget
 
-    def marcar_archivo_como_visto(self, video_path):
-        # Buscar el VideoItemWidget correspondiente y marcar el checkbox
-        for i in range(self.tree_widget.topLevelItemCount()):
-            seccion_item = self.tree_widget.topLevelItem(i)
-            for j in range(seccion_item.childCount()):
-                archivo_item = seccion_item.child(j)
-                widget = self.tree_widget.itemWidget(archivo_item, 0)
-                if isinstance(widget, VideoItemWidget):
-                    ruta_completa = os.path.join(self.cursos_data[self.curso_actual]['ruta'],
-                                                 widget.archivo['seccion'],
-                                                 widget.archivo['nombre'])
-                    if os.path.normpath(ruta_completa) == os.path.normpath(video_path):
-                        widget.checkbox.setChecked(True)
-                        return
-
-    def update_video_progress(self, curso_name, video_path, progress):
-        # Buscar el VideoItemWidget correspondiente y actualizar su barra de progreso
-        for i in range(self.tree_widget.topLevelItemCount()):
-            seccion_item = self.tree_widget.topLevelItem(i)
-            for j in range(seccion_item.childCount()):
-                archivo_item = seccion_item.child(j)
-                widget = self.tree_widget.itemWidget(archivo_item, 0)
-                if isinstance(widget, VideoItemWidget):
-                    ruta_completa = os.path.join(self.cursos_data[curso_name]['ruta'],
-                                                 widget.archivo['seccion'],
-                                                 widget.archivo['nombre'])
-                    if os.path.normpath(ruta_completa) == os.path.normpath(video_path):
-                        widget.update_progress(progress)
-                        return
+    def marcar_archivo_como_visto(self, clave):
+        # Marcar el checkbox del VideoItemWidget correspondiente
+        widget = self.widgets_archivos.get(clave)
+        if isinstance(widget, VideoItemWidget):
+            widget.checkbox.setChecked(True)
+
+    def update_video_progress(self, curso_name, clave, progress):
+        # Actualizar la barra de progreso del VideoItemWidget correspondiente
+        if curso_name != self.curso_actual:
+            return
+        widget = self.widgets_archivos.get(clave)
+        if isinstance(widget, VideoItemWidget):
+            widget.update_progress(progress)
+
+    def clave_desde_ruta(self, curso_name, ruta):
+        # Convierte una ruta absoluta en la clave relativa a la carpeta del curso
+        ruta = os.path.normpath(ruta)
+        curso = self.cursos_data.get(curso_name)
+        if not curso or not curso.get('ruta'):
+            return ruta
+        try:
+            relativa = os.path.relpath(ruta, os.path.normpath(curso['ruta']))
+        except ValueError:
+            return ruta
+        if relativa == os.pardir or relativa.startswith(os.pardir + os.sep):
+            return ruta
+        return relativa.replace(os.sep, '/')
+
+    def ruta_archivo(self, curso_name, archivo):
+        return os.path.join(self.cursos_data[curso_name]['ruta'], *archivo['id'].split('/'))
+
+    def obtener_indice_archivos(self, curso_name):
+        # Índice clave -> archivo, construido una vez por curso
+        indice = self.indices_archivos.get(curso_name)
+        if indice is None:
+            indice = {}
+            for archivos in self.storage.cargar_archivos(curso_name).values():
+                for archivo in archivos:
+                    indice[archivo['id']] = archivo
+            self.indices_archivos[curso_name] = indice
+            self.arboles_cargados[curso_name] = len(indice)
+            self.liberar_arboles(conservar=curso_name)
+        self.arboles_cargados.move_to_end(curso_name)
+        return indice
+
+    def liberar_arboles(self, conservar=None):
+        # Bajo presión de memoria se sueltan los árboles menos usados; se releen al abrirlos
+        en_uso = {conservar, self.curso_actual, self.video_widget.curso_name}
+        total = sum(self.arboles_cargados.values())
+        for curso_name in list(self.arboles_cargados):
+            if total <= self.MAX_LECCIONES_EN_MEMORIA:
+                break
+            if curso_name in en_uso or not self.storage.liberar_archivos(curso_name):
+                continue
+            total -= self.arboles_cargados.pop(curso_name)
+            self.indices_archivos.pop(curso_name, None)
 
     def volver_al_inicio(self):
         self.stacked_widget.setCurrentWidget(self.cursos_page)
+        self.widgets_archivos = {}
+        if self.grid_pendiente:
+            self.grid_pendiente = False
+            self.actualizar_grid_cursos()
         self.curso_actual = None
         self.tree_widget.clear()
         self.content_area.setCurrentWidget(self.text_browser)
         self.text_browser.setText("Selecciona un curso para ver su contenido.")
 
     def cargar_cursos(self):
-        try:
-            with open("cursos_data.json", "r", encoding="utf-8") as f:
-                self.cursos_data = json.load(f)
-            self.actualizar_grid_cursos()
-        except FileNotFoundError:
-            print(
-                "No se encontró el archivo cursos_data.json. Iniciando con una lista de cursos vacía.")
-            self.cursos_data = {}
+        self.cursos_data = self.storage.cargar_cursos()
+        for curso_name, curso in self.cursos_data.items():
+            self.course_watcher.vigilar_raiz(curso_name, curso.get('ruta'))
+        self.actualizar_grid_cursos()
 
-    def marcar_video_como_visto(self, curso_name, video_path):
-        print(f"Intentando marcar como visto: {video_path}")
+    def aplicar_cambios_en_disco(self, cursos):
+        # Un lote de eventos del vigilante: un reescaneo por curso afectado
+        for curso_name in cursos:
+            if curso_name in self.cursos_data:
+                self.reescanear_curso(curso_name)
+
+    def marcar_video_como_visto(self, curso_name, clave):
+        print(f"Intentando marcar como visto: {clave}")
         print(f"Curso: {curso_name}")
         if curso_name in self.cursos_data:
-            for seccion, archivos in self.cursos_data[curso_name]['archivos'].items():
-                for archivo in archivos:
-                    ruta_completa = os.path.join(
-                        self.cursos_data[curso_name]['ruta'], seccion, archivo['nombre'])
-                    print(f"Comparando: {ruta_completa} con {video_path}")
-                    if os.path.normpath(ruta_completa) == os.path.normpath(video_path):
-                        if not archivo['visto']:
-                            archivo['visto'] = True
-                            self.cursos_data[curso_name]['archivosVistos'] += 1
-                            self.actualizar_progreso_curso(curso_name)
-                            self.guardar_cursos_data()
-                            print(f"Video marcado como visto: {video_path}")
-                        else:
-                            print("El video ya estaba marcado como visto")
-                        return
+            archivo = self.obtener_indice_archivos(curso_name).get(clave)
+            if archivo is not None:
+                if not archivo['visto']:
+                    archivo['visto'] = True
+                    self.cursos_data[curso_name]['archivosVistos'] += 1
+                    self.actualizar_progreso_curso(curso_name)
+                    self.storage.guardar_archivo(
+                        curso_name, archivo['seccion'], archivo)
+                    print(f"Video marcado como visto: {clave}")
+                else:
+                    print("El video ya estaba marcado como visto")
+                return
         else:
             print(f"El curso {curso_name} no se encuentra en los datos")
         print("No se encontró el video en los datos del curso")
 
+    def on_thumbnail_ready(self, ruta):
+        if not self.curso_actual:
+            return
+        widget = self.widgets_archivos.get(self.clave_desde_ruta(self.curso_actual, ruta))
+        if isinstance(widget, VideoItemWidget):
+            widget.load_thumbnail()
+
+    def sondear_siguiente_pendiente(self):
+        # El siguiente curso se sondea cuando llega el resultado del anterior
+        self.sondeo_en_fondo = None
+        while self.duraciones_pendientes:
+            curso_name = self.duraciones_pendientes.pop(0)
+            if curso_name in self.cursos_data and curso_name not in self.duraciones:
+                self.sondeo_en_fondo = curso_name
+                self.sondear_duraciones(curso_name)
+                return
+
+    def sondear_duraciones(self, curso_name):
+        videos = [(clave, self.ruta_archivo(curso_name, archivo))
+                  for clave, archivo in self.obtener_indice_archivos(curso_name).items()
+                  if archivo['tipo'] == 'video']
+        self.duration_prober.probe_course(curso_name, videos)
+
+    def on_duraciones_listas(self, curso_name, duraciones):
+        if curso_name == self.sondeo_en_fondo:
+            QTimer.singleShot(0, self.sondear_siguiente_pendiente)
+        if curso_name not in self.cursos_data:
+            return
+        self.duraciones[curso_name] = duraciones
+        self.actualizar_duracion_vista(curso_name)
+        self.programar_actualizacion_grid()
+
+    def actualizar_duracion_vista(self, curso_name):
+        # Progreso ponderado por tiempo: lecciones vistas más lo reproducido de las demás
+        duraciones = self.duraciones.get(curso_name)
+        if duraciones is None:
+            return
+        curso = self.cursos_data[curso_name]
+        indice = self.obtener_indice_archivos(curso_name)
+        progresos = self.progress_data.get(curso_name, {})
+        total = 0
+        vista = 0
+        for clave, duracion in duraciones.items():
+            archivo = indice.get(clave)
+            if archivo is None:
+                continue
+            total += duracion
+            if archivo['visto']:
+                vista += duracion
+            else:
+                posicion = (progresos.get(clave) or {}).get('position', 0)
+                vista += min(posicion, duracion)
+        if curso.get('duracionTotal') != total or curso.get('duracionVista') != vista:
+            curso['duracionTotal'] = total
+            curso['duracionVista'] = vista
+            self.storage.guardar_resumen_curso(curso_name)
+
     def actualizar_progreso_curso(self, curso_name):
+        self.actualizar_duracion_vista(curso_name)
         curso = self.cursos_data[curso_name]
         total_archivos = curso['totalArchivos']
         archivos_vistos = curso['archivosVistos']
         progreso = (archivos_vistos / total_archivos) * \
             100 if total_archivos > 0 else 0
         print(f"Progreso del curso {curso_name}: {progreso:.2f}%")
-        self.actualizar_grid_cursos()
+        self.programar_actualizacion_grid()
 
-    def guardar_cursos_data(self):
-        with open("cursos_data.json", "w", encoding="utf-8") as f:
-            json.dump(self.cursos_data, f, ensure_ascii=False, indent=2)
-        print("Datos de cursos guardados en cursos_data.json")
+    def programar_actualizacion_grid(self):
+        # El grid solo se reconstruye cuando está visible, y una vez por ráfaga de cambios
+        if self.stacked_widget.currentWidget() is self.cursos_page:
+            self.grid_timer.start()
+        else:
+            self.grid_pendiente = True
 
     def actualizar_grid_cursos(self):
-        # Limpiar el grid layout
-        for i in reversed(range(self.grid_layout.count())):
-            self.grid_layout.itemAt(i).widget().setParent(None)
-
         if not self.cursos_data:
             self.empty_course_widget.show()
-            self.grid_layout.addWidget(self.empty_course_widget)
+            self.acomodar_grid([self.empty_course_widget], 1)
             return
 
         self.empty_course_widget.hide()
 
+        # Solo se construyen las tarjetas de cursos nuevos; las demás se actualizan
+        nuevos = [curso_name for curso_name in self.cursos_data if curso_name not in self.tarjetas]
+        if nuevos:
+            # Pedir los iconos de las tarjetas nuevas en un solo lote
+            self.icon_manager.request_icons(
+                [self.cursos_data[curso_name]['icon'] for curso_name in nuevos], size=50)
+        for curso_name in list(self.tarjetas):
+            if curso_name not in self.cursos_data:
+                self.tarjetas.pop(curso_name).deleteLater()
+        for curso_name, curso_data in self.cursos_data.items():
+            curso_card = self.tarjetas.get(curso_name)
+            if curso_card is None:
+                curso_card = CursoCard(curso_data, self.icon_manager)
+                curso_card.mousePressEvent = lambda event, c=curso_name: self.mostrar_detalle_curso(
+                    c)
+                curso_card.icon_changed.connect(self.update_curso_icon)
+                self.tarjetas[curso_name] = curso_card
+                continue
+            curso_card.curso = curso_data
+            curso_card.actualizar_progreso()
+            if curso_card.icon_name != curso_data['icon']:
+                curso_card.update_icon(curso_data['icon'])
+
+        self.reacomodar_grid()
+
+    def calcular_columnas(self):
         # Calcular el número de columnas basado en el ancho de la ventana
         ancho_ventana = self.width()
         ancho_tarjeta = 300  # Ancho de cada tarjeta de curso
         # 20 es el espacio entre tarjetas
-        columnas = max(1, ancho_ventana // (ancho_tarjeta + 20))
-
-        # Agregar las tarjetas de curso al grid
-        row = 0
-        col = 0
-        for curso_name, curso_data in self.cursos_data.items():
-            curso_card = CursoCard(curso_data, self.icon_manager)
-            curso_card.mousePressEvent = lambda event, c=curso_name: self.mostrar_detalle_curso(
-                c)
-            curso_card.icon_changed.connect(self.update_curso_icon)
-            self.grid_layout.addWidget(curso_card, row, col)
-
-            col += 1
-            if col >= columnas:
-                col = 0
-                row += 1
+        return max(1, ancho_ventana // (ancho_tarjeta + 20))
 
-    def resizeEvent(self, event):
-        super().resizeEvent(event)
-        self.actualizar_grid_cursos()
+    def reacomodar_grid(self):
+        if not self.cursos_data:
+            return
+        # Los cursos agregados con otra página visible aún no tienen tarjeta:
+        # actualizar_grid_cursos la crea al volver al grid
+        tarjetas = [self.tarjetas[curso_name] for curso_name in self.cursos_data
+                    if curso_name in self.tarjetas]
+        self.acomodar_grid(tarjetas, self.calcular_columnas())
+
+    def acomodar_grid(self, widgets, columnas):
+        # Sin cambios de columnas ni de cursos no se toca el layout
+        orden = (columnas, list(widgets))
+        if orden == self.orden_grid:
+            return
+        self.orden_grid = orden
+        while self.grid_layout.count():
+            self.grid_layout.takeAt(0)
+        for i, widget in enumerate(widgets):
+            self.grid_layout.addWidget(widget, i // columnas, i % columnas)
 
     def update_curso_icon(self, curso_id, new_icon):
+        # La tarjeta ya muestra el icono nuevo; solo falta guardarlo
         if curso_id in self.cursos_data:
             self.cursos_data[curso_id]['icon'] = new_icon
-            self.guardar_cursos_data()
-            self.actualizar_grid_cursos()
+            self.storage.guardar_resumen_curso(curso_id)
 
-    def generar_json_cursos(self):
-        """
-        ruta_cursos = "cursos_videos"
-        self.cursos_data = {}
-
-        for curso in os.listdir(ruta_cursos):
-            ruta_curso = os.path.join(ruta_cursos, curso)
-            if os.path.isdir(ruta_curso):
-                archivos = self.obtener_archivos(ruta_curso)
-                total_archivos = sum(len(files) for files in archivos.values())
-                self.cursos_data[curso] = {
-                    "id": curso,
-                    "name": curso,
-                    "description": f"Descripción del curso {curso}",
-                    "totalArchivos": total_archivos,
-                    "archivosVistos": 0,
-                    "icon": "folder/folder-color",
-                    "archivos": archivos,
-                    "progress": {},
-                    "ruta": ruta_curso
-                }
+    def importar_biblioteca(self):
+        # Cada subcarpeta de la raíz elegida se importa como un curso
+        if self.importacion_biblioteca is not None:
+            return
+        raiz = QFileDialog.getExistingDirectory(
+            self, "Seleccionar Carpeta con Cursos")
+        if not raiz:
+            return
 
-        with open("cursos_data.json", "w", encoding="utf-8") as f:
-            json.dump(self.cursos_data, f, ensure_ascii=False, indent=2)
+        task = LibraryScanTask(raiz)
+        dialogo = QProgressDialog("Buscando cursos...", "Cancelar", 0, 0, self)
+        dialogo.setWindowTitle("Importando biblioteca")
+        dialogo.setMinimumDuration(300)
+        dialogo.canceled.connect(task.cancel)
+        task.signals.courses_found.connect(
+            lambda cursos: dialogo.setMaximum(len(cursos)))
+        task.signals.course_scanned.connect(self.on_curso_biblioteca_escaneado)
+        task.signals.finished.connect(self.on_biblioteca_importada)
+        self.importacion_biblioteca = {
+            "task": task,
+            "dialogo": dialogo,
+            "rutas": {},
+            "agregados": 0,
+            "actualizados": 0,
+            "tiempos": [],
+            "fallos": [],
+            "sin_carpeta": None
+        }
+        task.signals.courses_found.connect(
+            lambda cursos: self.importacion_biblioteca["rutas"].update(cursos))
+        QThreadPool.globalInstance().start(task)
+
+    def on_curso_biblioteca_escaneado(self, nombre_curso, resultado, segundos, error):
+        importacion = self.importacion_biblioteca
+        carpeta = importacion["rutas"].get(nombre_curso)
+        if resultado is not None and not resultado[0]:
+            error = "sin lecciones"
+        elif resultado is not None and nombre_curso in self.cursos_data:
+            ruta_actual = self.cursos_data[nombre_curso].get('ruta') or ''
+            if os.path.normpath(ruta_actual) != os.path.normpath(carpeta):
+                error = f"ya existe un curso con ese nombre en {ruta_actual}"
+        if error:
+            importacion["fallos"].append((nombre_curso, error))
+            print(f"No se importó {nombre_curso}: {error}")
+        elif nombre_curso in self.cursos_data:
+            # Curso ya conocido: se fusiona conservando vistos y progreso
+            self.fusionar_escaneo(nombre_curso, resultado, self.storage.cargar_manifiesto(nombre_curso))
+            importacion["actualizados"] += 1
+        elif nombre_curso in self.importaciones:
+            importacion["fallos"].append((nombre_curso, "ya se está agregando"))
+        else:
+            if importacion["sin_carpeta"] is None:
+                # Una sola pasada de stat por importación, no una por curso agregado
+                importacion["sin_carpeta"] = self.cursos_sin_carpeta()
+            self.agregar_curso(nombre_curso, carpeta, resultado, importacion["sin_carpeta"])
+            importacion["agregados"] += 1
+        importacion["tiempos"].append((nombre_curso, segundos))
+        print(f"Curso {nombre_curso} escaneado en {segundos:.2f} s")
+        dialogo = importacion["dialogo"]
+        dialogo.setValue(len(importacion["tiempos"]))
+        dialogo.setLabelText(f"{len(importacion['tiempos'])} de {dialogo.maximum()} cursos\n{nombre_curso}")
+
+    def on_biblioteca_importada(self, completo):
+        importacion = self.importacion_biblioteca
+        self.importacion_biblioteca = None
+        importacion["dialogo"].reset()
+        tiempos = sorted(importacion["tiempos"], key=lambda t: t[1], reverse=True)
+        resumen = (f"{importacion['agregados']} cursos agregados, "
+                   f"{importacion['actualizados']} actualizados, "
+                   f"{len(importacion['fallos'])} con errores.")
+        if not completo:
+            resumen = "Importación interrumpida. " + resumen
+        if tiempos:
+            resumen += "\n\nMás lentos:\n" + "\n".join(
+                f"{nombre}: {segundos:.2f} s" for nombre, segundos in tiempos[:5])
+        if importacion["fallos"]:
+            resumen += "\n\nErrores:\n" + "\n".join(
+                f"{nombre}: {error}" for nombre, error in importacion["fallos"])
+        print(resumen)
+        QMessageBox.information(self, "Biblioteca importada", resumen)
+
+    def reescanear_curso(self, curso_name):
+        # Vuelve a leer la carpeta del curso en el pool de hilos conservando vistos y progreso
+        ruta = self.cursos_data[curso_name].get('ruta')
+        if not ruta or not os.path.isdir(ruta):
+            # Carpeta desmontada o renombrada: no se toca el árbol hasta que vuelva
+            print(f"No se reescanea {curso_name}: no se encuentra la carpeta {ruta}")
+            return
+        if curso_name in self.reescaneos:
+            self.reescaneos_repetir.add(curso_name)
+            return
+        manifiesto = self.storage.cargar_manifiesto(curso_name)
+        task = ScanTask(ruta, manifiesto)
+        task.signals.finished.connect(
+            lambda resultado: self.on_reescaneo_terminado(curso_name, manifiesto, resultado))
+        task.signals.cancelled.connect(
+            lambda: self.on_reescaneo_terminado(curso_name, manifiesto, None))
+        self.reescaneos[curso_name] = task
+        QThreadPool.globalInstance().start(task)
+
+    def on_reescaneo_terminado(self, curso_name, manifiesto, resultado):
+        self.reescaneos.pop(curso_name, None)
+        if curso_name not in self.cursos_data:
+            return
+        if resultado is not None:
+            self.fusionar_escaneo(curso_name, resultado, manifiesto)
+        if curso_name in self.reescaneos_repetir:
+            self.reescaneos_repetir.discard(curso_name)
+            self.reescanear_curso(curso_name)
 
-        self.actualizar_grid_cursos()
-        """
-        pass
+    def fusionar_escaneo(self, curso_name, resultado, manifiesto):
+        curso = self.cursos_data[curso_name]
+        total_archivos, archivos, nuevo_manifiesto = resultado
+        anteriores = self.obtener_indice_archivos(curso_name)
+        modificados = archivos_modificados(manifiesto or {}, nuevo_manifiesto)
+
+        vistos = 0
+        nuevas = []
+        claves = set()
+        for lecciones in archivos.values():
+            for leccion in lecciones:
+                clave = leccion.id
+                claves.add(clave)
+                anterior = anteriores.get(clave)
+                if anterior is None:
+                    nuevas.append(leccion)
+                    continue
+                leccion.visto = anterior.visto
+                vistos += leccion.visto
+                if clave in modificados and self.load_video_progress(curso_name, clave):
+                    # El archivo cambió: la posición guardada ya no sirve
+                    self.save_video_progress(curso_name, clave, {"position": 0, "duration": 0})
+        eliminadas = set(anteriores) - claves
+        movidas = set()
+        if nuevas and eliminadas:
+            movidas = self.reasignar_movidas(curso_name, nuevas, curso_name, eliminadas,
+                                             manifiesto, nuevo_manifiesto)
+            vistos += sum(leccion.visto for leccion in nuevas if leccion.id in movidas)
+        nuevos = len(nuevas) - len(movidas)
+        eliminados = len(eliminadas) - len(movidas)
+        if not nuevas and not eliminadas and total_archivos == curso['totalArchivos']:
+            self.storage.guardar_manifiesto(curso_name, nuevo_manifiesto)
+            self.course_watcher.actualizar_curso(curso_name, nuevo_manifiesto)
+            return False
 
-    def contar_archivos(self, ruta):
-        total = 0
-        for raiz, dirs, archivos in os.walk(ruta):
-            for archivo in archivos:
-                if archivo.lower().endswith(('.mp4', '.avi', '.mov', '.html')):
-                    total += 1
-        return total
-
-    def obtener_archivos(self, ruta):
-        def ordenar_clave(nombre):
-            match = re.match(r'^(\d+)', nombre)
-            if match:
-                numero = int(match.group(1))
-                resto = nombre[match.end():].lower()
-                return (numero, resto)
-            else:
-                return (float('inf'), nombre.lower())
-        archivos = {}
-        for raiz, dirs, archivos_lista in os.walk(ruta):
-            seccion = os.path.relpath(raiz, ruta)
-            archivos_seccion = []
-            for archivo in archivos_lista:
-                if archivo.lower().endswith(('.mp4', '.avi', '.mov', '.html')):
-                    archivos_seccion.append({
-                        "nombre": archivo,
-                        "tipo": "video" if archivo.lower().endswith(('.mp4', '.avi', '.mov')) else "html",
-                        "visto": False,
-                        "seccion": seccion
-                    })
-
-            if archivos_seccion:
-                if seccion == '.':
-                    seccion = 'Principal'
-                archivos[seccion] = sorted(
-                    archivos_seccion, key=lambda x: ordenar_clave(x['nombre']))
-
-        # Ordenar las secciones
-        archivos_ordenados = dict(
-            sorted(archivos.items(), key=lambda x: ordenar_clave(x[0])))
-        return archivos_ordenados
-
-    def ordenar_clave(self, nombre):
-        match = re.search(r'^(\d+)', nombre)
-        if match:
-            numero = int(match.group(1))
-            resto = nombre[match.end():]
-            return (numero, resto.lower())
-        else:
-            return (float('inf'), nombre.lower())
+        curso['archivos'] = archivos
+        curso['totalArchivos'] = total_archivos
+        curso['archivosVistos'] = vistos
+        self.indices_archivos.pop(curso_name, None)
+        self.arboles_cargados.pop(curso_name, None)
+        self.storage.guardar_curso(curso_name)
+        self.storage.guardar_manifiesto(curso_name, nuevo_manifiesto)
+        self.course_watcher.actualizar_curso(curso_name, nuevo_manifiesto)
+        self.sondear_duraciones(curso_name)
+        self.actualizar_progreso_curso(curso_name)
+        print(f"Curso {curso_name} reescaneado: {nuevos} nuevos, {eliminados} eliminados, "
+              f"{len(movidas)} movidos, {len(modificados)} modificados")
+        if self.curso_actual == curso_name and self.stacked_widget.currentWidget() is self.curso_detail_page:
+            self.construir_arbol(curso_name)
+        return True
+
+    def reasignar_movidas(self, curso_name, lecciones, origen, claves_origen, manifiesto_origen, manifiesto):
+        # Una lección nueva con la misma huella que una desaparecida es el mismo
+        # archivo renombrado o movido: hereda su visto y su progreso
+        huellas_origen = {}
+        for clave, huella in huellas_por_clave(manifiesto_origen or {}).items():
+            if clave in claves_origen:
+                huellas_origen.setdefault(huella, clave)
+        if not huellas_origen:
+            return set()
+        huellas = huellas_por_clave(manifiesto)
+        indice_origen = self.obtener_indice_archivos(origen)
+        movidas = set()
+        for leccion in lecciones:
+            clave_origen = huellas_origen.pop(huellas.get(leccion.id), None)
+            if clave_origen is None:
+                continue
+            leccion.visto = indice_origen[clave_origen].visto
+            progress = self.progress_data.get(origen, {}).get(clave_origen)
+            if progress:
+                # El tiempo visto se recalcula una vez al terminar la fusión
+                self.save_video_progress(curso_name, leccion.id, dict(progress), actualizar=False)
+                # Un archivo nuevo con el nombre antiguo no debe heredar la posición
+                self.eliminar_progreso(origen, clave_origen)
+            movidas.add(leccion.id)
+        return movidas
+
+    def cursos_sin_carpeta(self):
+        return [curso_name for curso_name, curso in self.cursos_data.items()
+                if curso.get('ruta') and not os.path.isdir(curso['ruta'])]
+
+    def recuperar_cursos_movidos(self, curso_name, archivos, manifiesto, sin_carpeta):
+        # El curso importado puede ser la carpeta movida de otro cuya ruta ya no existe
+        lecciones = [leccion for lista in archivos.values() for leccion in lista]
+        for origen in sin_carpeta:
+            if not lecciones:
+                break
+            if origen == curso_name or origen not in self.cursos_data:
+                continue
+            manifiesto_origen = self.storage.cargar_manifiesto(origen)
+            if not manifiesto_origen:
+                continue
+            movidas = self.reasignar_movidas(curso_name, lecciones, origen,
+                                             set(self.obtener_indice_archivos(origen)),
+                                             manifiesto_origen, manifiesto)
+            if movidas:
+                print(f"{len(movidas)} lecciones de {origen} encontradas en {curso_name}")
+                lecciones = [leccion for leccion in lecciones if leccion.id not in movidas]
+        return sum(leccion.visto for lista in archivos.values() for leccion in lista)
+
+    def reescanear_curso_actual(self):
+        if self.curso_actual:
+            self.reescanear_curso(self.curso_actual)
 
     def mostrar_detalle_curso(self, curso_name):
         self.curso_actual = curso_name
@@ -1055,6 +1429,8 @@ class CursoTracker(QMainWindow):
 
         # Actualizar el icono y nombre del curso
         curso_data = self.cursos_data[curso_name]
+        # Renderizar primero el tamaño grande para que el de 32px se reescale desde la cache
+        icon_grande = self.icon_manager.get_icon(curso_data['icon'], size=256)
         icon = self.icon_manager.get_icon(curso_data['icon'], size=32)
         self.curso_icon_label.setPixmap(icon.pixmap(32, 32))
         self.curso_name_label.setText(curso_data['name'])
@@ -1071,11 +1447,40 @@ class CursoTracker(QMainWindow):
         # Programar el ajuste del título para después de que se haya actualizado el layout
         QTimer.singleShot(0, self.ajustar_titulo_curso)
 
-        for seccion, archivos in self.cursos_data[curso_name]['archivos'].items():
+        self.obtener_indice_archivos(curso_name)
+        self.course_watcher.curso_abierto(curso_name, self.storage.cargar_manifiesto)
+        if curso_name not in self.duraciones:
+            self.sondear_duraciones(curso_name)
+        self.construir_arbol(curso_name)
+
+        # Añade estas líneas al final del método
+        self.curso_info_icon.setPixmap(icon_grande.pixmap(256, 256))
+        self.curso_info_name.setText(curso_data['name'])
+        self.content_area.setCurrentWidget(self.curso_info_widget)
+        self.stacked_widget.setCurrentWidget(self.curso_detail_page)
+        self.btn_volver_inicio.show()
+
+    def construir_arbol(self, curso_name):
+        # Reconstruye solo el árbol de lecciones; tras un reescaneo se conservan la
+        # lección seleccionada, las secciones abiertas y el desplazamiento
+        seleccion = None
+        for item in self.tree_widget.selectedItems():
+            widget = self.tree_widget.itemWidget(item, 0)
+            if isinstance(widget, (VideoItemWidget, FileItemWidget)):
+                seleccion = widget.archivo['id']
+        abiertas = set()
+        for i in range(self.tree_widget.topLevelItemCount()):
+            item = self.tree_widget.topLevelItem(i)
+            if item.isExpanded():
+                abiertas.add(item.text(0))
+        desplazamiento = self.tree_widget.verticalScrollBar().value()
+
+        self.tree_widget.clear()
+        self.widgets_archivos = {}
+        for seccion, archivos in self.storage.cargar_archivos(curso_name).items():
             seccion_item = QTreeWidgetItem(self.tree_widget, [seccion])
             for archivo in archivos:
                 archivo_item = QTreeWidgetItem(seccion_item)
-                archivo['seccion'] = seccion  # Añadir la sección al archivo
                 if archivo['tipo'] == 'video':
                     widget = VideoItemWidget(
                         archivo,
@@ -1090,18 +1495,11 @@ class CursoTracker(QMainWindow):
                         self.marcar_archivo
                     )
                 self.tree_widget.setItemWidget(archivo_item, 0, widget)
-
-        self.tree_widget.itemSelectionChanged.connect(
-            self.on_item_selection_changed)
-
-        # Añade estas líneas al final del método
-        curso_data = self.cursos_data[curso_name]
-        icon = self.icon_manager.get_icon(curso_data['icon'], size=256)
-        self.curso_info_icon.setPixmap(icon.pixmap(256, 256))
-        self.curso_info_name.setText(curso_data['name'])
-        self.content_area.setCurrentWidget(self.curso_info_widget)
-        self.stacked_widget.setCurrentWidget(self.curso_detail_page)
-        self.btn_volver_inicio.show()
+                self.widgets_archivos[archivo['id']] = widget
+                if archivo['id'] == seleccion:
+                    archivo_item.setSelected(True)
+            seccion_item.setExpanded(seccion in abiertas)
+        self.tree_widget.verticalScrollBar().setValue(desplazamiento)
 
     def on_item_selection_changed(self):
         for item in self.tree_widget.selectedItems():
@@ -1122,37 +1520,46 @@ class CursoTracker(QMainWindow):
             else:
                 self.cursos_data[self.curso_actual]['archivosVistos'] -= 1
             self.actualizar_progreso_curso(self.curso_actual)
-            self.guardar_cursos_data()
+            self.storage.guardar_archivo(
+                self.curso_actual, archivo['seccion'], archivo)
         print(f"Archivo: {archivo['nombre']}, Visto: {checked}")
 
     def load_progress_data(self):
-        try:
-            with open("progress_data.json", "r", encoding="utf-8") as f:
-                self.progress_data = json.load(f)
-        except FileNotFoundError:
-            print("Archivo progress_data.json no encontrado. Creando uno nuevo.")
-            self.progress_data = {}
-            self.save_progress_data()
-
-    def load_video_progress(self, curso_name, video_path):
-        video_path = os.path.normpath(video_path)
-        if curso_name in self.progress_data:
-            for path, progress in self.progress_data[curso_name].items():
-                if os.path.normpath(path) == video_path:
-                    print(f"Progreso encontrado para {video_path}: {progress}")
-                    return progress
-        # print(f"No se encontró progreso para {video_path}")
-        return None
-
-    def save_video_progress(self, curso_name, video_path, progress):
+        self.progress_data = self.storage.load_progress_data()
+        # Migración: las rutas absolutas antiguas pasan a claves relativas al curso
+        migrado = False
+        for curso_name, progresos in self.progress_data.items():
+            if any(os.path.isabs(clave) for clave in progresos):
+                # Las que no se pueden convertir (curso borrado o movido) se quedan igual
+                migradas = {
+                    self.clave_desde_ruta(curso_name, clave) if os.path.isabs(clave) else clave: progress
+                    for clave, progress in progresos.items()}
+                if list(migradas) != list(progresos):
+                    self.progress_data[curso_name] = migradas
+                    migrado = True
+        if migrado:
+            self.storage.reemplazar_progreso()
+
+    def load_video_progress(self, curso_name, clave):
+        progress = self.progress_data.get(curso_name, {}).get(clave)
+        if progress is not None:
+            print(f"Progreso encontrado para {clave}: {progress}")
+        return progress
+
+    def save_video_progress(self, curso_name, clave, progress, actualizar=True):
         if curso_name not in self.progress_data:
             self.progress_data[curso_name] = {}
-        self.progress_data[curso_name][video_path] = progress
-        self.save_progress_data()
-
-    def save_progress_data(self):
-        with open("progress_data.json", "w", encoding="utf-8") as f:
-            json.dump(self.progress_data, f, ensure_ascii=False, indent=2)
+        self.progress_data[curso_name][clave] = progress
+        self.storage.save_video_progress(curso_name, clave)
+        if actualizar and curso_name in self.duraciones:
+            # La barra por tiempo avanza también con lo visto a medias; el timer agrupa los refrescos
+            self.actualizar_duracion_vista(curso_name)
+            self.programar_actualizacion_grid()
+
+    def eliminar_progreso(self, curso_name, clave):
+        progresos = self.progress_data.get(curso_name)
+        if progresos and progresos.pop(clave, None) is not None:
+            self.storage.eliminar_progreso(curso_name, clave)
 
     def mostrar_archivo(self, item, column):
         if self.curso_actual is None:
@@ -1164,9 +1571,8 @@ class CursoTracker(QMainWindow):
             return
 
         nombre_archivo = widget.nombre_label.text()
-        ruta_curso = self.cursos_data[self.curso_actual]['ruta']
         seccion = item.parent().text(0) if item.parent() else 'Principal'
-        ruta_archivo = os.path.join(ruta_curso, seccion, nombre_archivo)
+        ruta_archivo = self.ruta_archivo(self.curso_actual, widget.archivo)
 
         breadcrumb = self.crear_breadcrumb(
             self.curso_actual, seccion, nombre_archivo)
@@ -1179,7 +1585,7 @@ class CursoTracker(QMainWindow):
             if ruta_archivo.lower().endswith(('.mp4', '.avi', '.mov')):
                 # Cargar el progreso guardado
                 progress = self.load_video_progress(
-                    self.curso_actual, ruta_archivo)
+                    self.curso_actual, widget.archivo['id'])
 
                 if self.video_widget.current_video_path != ruta_archivo:
                     # Si es un video diferente, establecer una nueva fuente
@@ -1236,32 +1642,72 @@ class CursoTracker(QMainWindow):
             self, "Seleccionar Carpeta de Curso")
         if carpeta:
             nombre_curso = os.path.basename(carpeta)
-            if nombre_curso in self.cursos_data:
+            if nombre_curso in self.cursos_data or nombre_curso in self.importaciones:
                 QMessageBox.warning(self, "Curso Existente", f"El curso '{
                                     nombre_curso}' ya existe.")
                 return
 
-            total_archivos = self.contar_archivos(carpeta)
-            self.cursos_data[nombre_curso] = {
-                "id": nombre_curso,
-                "name": nombre_curso,
-                "description": f"Descripción del curso {nombre_curso}",
-                "totalArchivos": total_archivos,
-                "archivosVistos": 0,
-                "icon": "folder/folder-color",
-                "archivos": self.obtener_archivos(carpeta),
-                "progress": {},
-                "ruta": carpeta
-            }
-
-            self.guardar_cursos_data()
-            self.actualizar_grid_cursos()
-            QMessageBox.information(self, "Curso Agregado", f"El curso '{
-                                    nombre_curso}' ha sido agregado exitosamente.")
+            # El escaneo corre en el pool de hilos; la ventana sigue respondiendo
+            task = ScanTask(carpeta)
+            dialogo = QProgressDialog(
+                f"Escaneando {nombre_curso}...", "Cancelar", 0, 0, self)
+            dialogo.setWindowTitle("Agregando curso")
+            dialogo.setMinimumDuration(300)
+            dialogo.canceled.connect(task.cancel)
+            task.signals.progress.connect(
+                lambda archivos, directorios, seccion: dialogo.setLabelText(
+                    f"Escaneando {nombre_curso}...\n{archivos} archivos en {directorios} carpetas\n{seccion}"))
+            task.signals.finished.connect(
+                lambda resultado: self.on_importacion_terminada(nombre_curso, carpeta, resultado))
+            task.signals.cancelled.connect(
+                lambda: self.on_importacion_cancelada(nombre_curso))
+            self.importaciones[nombre_curso] = (task, dialogo)
+            QThreadPool.globalInstance().start(task)
+
+    def on_importacion_terminada(self, nombre_curso, carpeta, resultado):
+        task, dialogo = self.importaciones.pop(nombre_curso)
+        dialogo.reset()
+        if nombre_curso in self.cursos_data:
+            # La importación de biblioteca lo agregó mientras tanto
+            return
+        self.agregar_curso(nombre_curso, carpeta, resultado)
+        self.actualizar_grid_cursos()
+        QMessageBox.information(self, "Curso Agregado", f"El curso '{
+                                nombre_curso}' ha sido agregado exitosamente.")
+
+    def agregar_curso(self, nombre_curso, carpeta, resultado, sin_carpeta=None):
+        total_archivos, archivos, manifiesto = resultado
+        # El curso entra completo de una vez en cursos_data y en el grid
+        self.cursos_data[nombre_curso] = {
+            "id": nombre_curso,
+            "name": nombre_curso,
+            "description": f"Descripción del curso {nombre_curso}",
+            "totalArchivos": total_archivos,
+            "archivosVistos": 0,
+            "icon": "folder/folder-color",
+            "archivos": archivos,
+            "progress": {},
+            "ruta": carpeta
+        }
+        if sin_carpeta is None:
+            sin_carpeta = self.cursos_sin_carpeta()
+        self.cursos_data[nombre_curso]['archivosVistos'] = self.recuperar_cursos_movidos(
+            nombre_curso, archivos, manifiesto, sin_carpeta)
+
+        self.storage.guardar_curso(nombre_curso)
+        self.storage.guardar_manifiesto(nombre_curso, manifiesto)
+        self.course_watcher.vigilar_raiz(nombre_curso, carpeta)
+        self.sondear_duraciones(nombre_curso)
+        self.programar_actualizacion_grid()
+
+    def on_importacion_cancelada(self, nombre_curso):
+        task, dialogo = self.importaciones.pop(nombre_curso)
+        dialogo.reset()
+        print(f"Importación de {nombre_curso} cancelada")
 
     def resizeEvent(self, event):
         super().resizeEvent(event)
-        self.actualizar_grid_cursos()
+        self.reacomodar_grid()
         self.ajustar_titulo_curso()
 
     def ajustar_titulo_curso(self):
@@ -1280,8 +1726,26 @@ class CursoTracker(QMainWindow):
                     nombre_original, Qt.ElideRight, available_width)
                 self.curso_name_label.setText(elided_text)
 
+    def cancelar_escaneos(self):
+        # Al cerrar no deben quedar escaneos en el pool ni resultados que lleguen
+        # cuando el almacenamiento ya está cerrado
+        tareas = list(self.reescaneos.values())
+        for task, dialogo in self.importaciones.values():
+            tareas.append(task)
+            dialogo.reset()
+        if self.importacion_biblioteca is not None:
+            tareas.append(self.importacion_biblioteca["task"])
+            self.importacion_biblioteca["dialogo"].reset()
+        for task in tareas:
+            task.signals.blockSignals(True)
+            task.cancel()
+
     def closeEvent(self, event):
+        self.cancelar_escaneos()
         self.video_widget.save_current_progress()
+        self.duration_prober.close()
+        self.thumbnails.close()
+        self.storage.close()
         super().closeEvent(event)
 
 
@@ -0,0 +1,164 @@
+import os
+import json
+import struct
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, QTimer, Signal
+
+
+def leer_duracion_mp4(f, inicio, fin):
+    # Recorre las cajas (atoms) hasta moov/mvhd sin leer los datos de video
+    posicion = inicio
+    while posicion + 8 <= fin:
+        f.seek(posicion)
+        cabecera = f.read(8)
+        if len(cabecera) < 8:
+            return None
+        tamano, tipo = struct.unpack(">I4s", cabecera)
+        cabecera_len = 8
+        if tamano == 1:
+            tamano = struct.unpack(">Q", f.read(8))[0]
+            cabecera_len = 16
+        elif tamano == 0:
+            tamano = fin - posicion
+        if tamano < cabecera_len:
+            return None
+        if tipo == b"moov":
+            return leer_duracion_mp4(f, posicion + cabecera_len, posicion + tamano)
+        if tipo == b"mvhd":
+            version = f.read(4)[0]
+            if version == 1:
+                timescale, duracion = struct.unpack(">16xIQ", f.read(28))
+            else:
+                timescale, duracion = struct.unpack(">8xII", f.read(16))
+            if timescale == 0:
+                return None
+            return duracion * 1000 // timescale
+        posicion += tamano
+    return None
+
+
+def leer_duracion_avi(f):
+    # Cabecera principal avih: microsegundos por cuadro y total de cuadros
+    cabecera = f.read(56)
+    if len(cabecera) < 56 or cabecera[:4] != b"RIFF" or cabecera[8:12] != b"AVI " \
+            or cabecera[24:28] != b"avih":
+        return None
+    microsegundos, = struct.unpack_from("<I", cabecera, 32)
+    cuadros, = struct.unpack_from("<I", cabecera, 48)
+    return microsegundos * cuadros // 1000
+
+
+def leer_duracion(ruta):
+    """Duración en milisegundos leída de la cabecera del contenedor, o None."""
+    try:
+        with open(ruta, "rb") as f:
+            if ruta.lower().endswith(".avi"):
+                return leer_duracion_avi(f)
+            return leer_duracion_mp4(f, 0, os.fstat(f.fileno()).st_size)
+    except (OSError, struct.error, IndexError):
+        return None
+
+
+def formatear_duracion(ms):
+    minutos = round(ms / 60000)
+    if minutos < 60:
+        return f"{minutos} min"
+    return f"{minutos // 60} h {minutos % 60:02d} min"
+
+
+class DurationProbeSignals(QObject):
+    probed = Signal(str, object, object)
+
+
+class DurationProbeTask(QRunnable):
+    def __init__(self, curso_name, videos, cache):
+        super().__init__()
+        # videos: lista de (clave, ruta); cache: {ruta: [tamaño, mtime_ns, duración]}
+        self.curso_name = curso_name
+        self.videos = videos
+        self.cache = cache
+        self.signals = DurationProbeSignals()
+
+    def run(self):
+        duraciones = {}
+        nuevas = {}
+        for clave, ruta in self.videos:
+            try:
+                st = os.stat(ruta)
+            except OSError:
+                continue
+            entrada = self.cache.get(ruta)
+            if entrada is not None and entrada[0] == st.st_size and entrada[1] == st.st_mtime_ns:
+                duracion = entrada[2]
+            else:
+                duracion = leer_duracion(ruta)
+                nuevas[ruta] = [st.st_size, st.st_mtime_ns, duracion]
+            if duracion is not None:
+                duraciones[clave] = duracion
+        self.signals.probed.emit(self.curso_name, duraciones, nuevas)
+
+
+class DurationProber(QObject):
+    """Lee en segundo plano la duración de los videos de un curso.
+
+    Las duraciones se guardan en media_cache.json por ruta con el tamaño y el
+    mtime del archivo, así que un video sin cambios no se vuelve a leer.
+    """
+
+    durations_ready = Signal(str, object)
+
+    def __init__(self, parent=None, cache_path="media_cache.json", save_delay_ms=2000):
+        super().__init__(parent)
+        self.cache_path = cache_path
+        self.cache = self.load_cache()
+        self.tasks = {}
+        # Última lista de videos pedida mientras el curso ya se estaba sondeando
+        self.repetir = {}
+        self.save_timer = QTimer(self)
+        self.save_timer.setSingleShot(True)
+        self.save_timer.setInterval(save_delay_ms)
+        self.save_timer.timeout.connect(self.save_cache)
+
+    def load_cache(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            print(f"Cache de duraciones dañada, se regenera: {str(e)}")
+            return {}
+
+    def save_cache(self):
+        tmp_path = self.cache_path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.cache, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"Error guardando {self.cache_path}: {str(e)}")
+
+    def probe_course(self, curso_name, videos):
+        if curso_name in self.tasks:
+            # Tras un reescaneo puede haber videos nuevos: se sondea otra vez al terminar
+            self.repetir[curso_name] = videos
+            return
+        cache = {ruta: self.cache[ruta] for clave, ruta in videos if ruta in self.cache}
+        task = DurationProbeTask(curso_name, videos, cache)
+        task.signals.probed.connect(self.on_probed)
+        self.tasks[curso_name] = task
+        QThreadPool.globalInstance().start(task)
+
+    def on_probed(self, curso_name, duraciones, nuevas):
+        self.tasks.pop(curso_name, None)
+        if nuevas:
+            self.cache.update(nuevas)
+            self.save_timer.start()
+        self.durations_ready.emit(curso_name, duraciones)
+        videos = self.repetir.pop(curso_name, None)
+        if videos is not None:
+            self.probe_course(curso_name, videos)
+
+    def close(self):
+        if self.save_timer.isActive():
+            self.save_timer.stop()
+            self.save_cache()
@@ -0,0 +1,334 @@
+import os
+import re
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed, FIRST_COMPLETED
+from PySide6.QtCore import QObject, QRunnable, Signal
+from storage import Leccion, clave_archivo
+
+EXTENSIONES_VIDEO = ('.mp4', '.avi', '.mov')
+EXTENSIONES_CURSO = EXTENSIONES_VIDEO + ('.html',)
+
+PATRON_NUMERO = re.compile(r'^(\d+)')
+
+HUELLA_BLOQUE = 256 * 1024
+
+
+def clave_orden(nombre):
+    # Orden natural: "2 intro" va antes que "10 final"; sin número, al final
+    match = PATRON_NUMERO.match(nombre)
+    if match:
+        return (int(match.group(1)), nombre[match.end():].lower())
+    return (float('inf'), nombre.lower())
+
+
+def huella_archivo(ruta, tamano):
+    """Huella del contenido: el tamaño más un hash del inicio y del final.
+
+    Solo se leen 2 * HUELLA_BLOQUE bytes, así que un video de varios GB cuesta
+    lo mismo que uno pequeño. Devuelve None si no se pudo leer.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    try:
+        with open(ruta, 'rb') as f:
+            h.update(f.read(HUELLA_BLOQUE))
+            if tamano > 2 * HUELLA_BLOQUE:
+                f.seek(-HUELLA_BLOQUE, os.SEEK_END)
+            h.update(f.read(HUELLA_BLOQUE))
+    except OSError:
+        return None
+    return f"{tamano:x}-{h.hexdigest()}"
+
+
+def escanear_directorio(ruta_curso, ruta, anterior=None):
+    """Lee un directorio y devuelve (seccion, lecciones, subdirectorios, entrada del manifiesto).
+
+    Si su mtime coincide con la entrada anterior del manifiesto no se lista de
+    nuevo: las lecciones y subcarpetas salen del propio manifiesto. Las huellas
+    de los archivos con el mismo tamaño y mtime se reutilizan; las demás quedan
+    en None para que escanear_curso las calcule.
+
+    Si una subcarpeta ya conocida no se puede leer se devuelve lo del escaneo
+    anterior, para que un fallo pasajero no borre sus lecciones ni sus vistos.
+    """
+    relativa = os.path.relpath(ruta, ruta_curso)
+    seccion = 'Principal' if relativa == '.' else relativa
+    try:
+        mtime = os.stat(ruta).st_mtime_ns
+    except OSError as e:
+        return directorio_ilegible(ruta, relativa, seccion, anterior, e)
+
+    # Los manifiestos anteriores a las huellas se listan de nuevo una vez
+    if anterior is not None and anterior["mtime"] == mtime and "huellas" in anterior:
+        return desde_manifiesto(ruta, seccion, anterior)
+
+    lecciones = []
+    subdirectorios = []
+    tamanos = {}
+    huellas = {}
+    huellas_anteriores = anterior.get("huellas", {}) if anterior is not None else {}
+    try:
+        with os.scandir(ruta) as entradas:
+            for entrada in entradas:
+                try:
+                    es_directorio = entrada.is_dir()
+                except OSError:
+                    es_directorio = False
+                if es_directorio:
+                    # Igual que os.walk: los enlaces a carpetas no se recorren
+                    if not entrada.is_symlink():
+                        subdirectorios.append(entrada.path)
+                    continue
+                tipo = tipo_leccion(entrada.name)
+                if tipo is not None:
+                    lecciones.append(Leccion(entrada.name, tipo, False, seccion))
+                    try:
+                        st = entrada.stat()
+                    except OSError:
+                        tamanos[entrada.name] = -1
+                        continue
+                    tamanos[entrada.name] = st.st_size
+                    previa = huellas_anteriores.get(entrada.name)
+                    if previa is not None and previa[0] == st.st_mtime_ns and previa[1] is not None \
+                            and anterior["archivos"].get(entrada.name) == st.st_size:
+                        huellas[entrada.name] = previa
+                    else:
+                        huellas[entrada.name] = [st.st_mtime_ns, None]
+    except OSError as e:
+        return directorio_ilegible(ruta, relativa, seccion, anterior, e)
+    entrada_manifiesto = {
+        "mtime": mtime,
+        "subdirs": [os.path.basename(subdirectorio) for subdirectorio in subdirectorios],
+        "archivos": tamanos,
+        "huellas": huellas
+    }
+    return seccion, lecciones, subdirectorios, entrada_manifiesto
+
+
+def desde_manifiesto(ruta, seccion, anterior):
+    lecciones = [Leccion(nombre, tipo_leccion(nombre), False, seccion)
+                 for nombre in anterior["archivos"]]
+    subdirectorios = [os.path.join(ruta, nombre) for nombre in anterior["subdirs"]]
+    return seccion, lecciones, subdirectorios, anterior
+
+
+def directorio_ilegible(ruta, relativa, seccion, anterior, error):
+    print(f"No se pudo leer {ruta}: {str(error)}")
+    # La raíz no se sustituye: escanear_curso la trata como curso ilegible
+    if relativa == '.' or anterior is None:
+        return seccion, [], [], None
+    return desde_manifiesto(ruta, seccion, anterior)
+
+
+def tipo_leccion(nombre):
+    extension = os.path.splitext(nombre)[1].lower()
+    if extension in EXTENSIONES_VIDEO:
+        return "video"
+    if extension in EXTENSIONES_CURSO:
+        return "html"
+    return None
+
+
+def escanear_curso(ruta, manifiesto=None, max_workers=8, progreso=None, cancelado=None):
+    """Recorre la carpeta de un curso una sola vez.
+
+    Cada subcarpeta se lee en un hilo del pool, lo que reparte la latencia de
+    los discos de red. Con el manifiesto de un escaneo anterior solo se listan
+    las carpetas cuyo mtime cambió, y después solo se calcula la huella de los
+    archivos nuevos o modificados, también en el pool. Devuelve (total_archivos, archivos,
+    manifiesto) con las secciones y lecciones ya en orden natural, o None si
+    se activó el evento cancelado. Si no se puede leer la carpeta raíz lanza
+    OSError, para no confundir un disco desmontado con un curso vacío.
+
+    progreso(archivos, directorios, seccion) se llama tras cada carpeta leída.
+    """
+    manifiesto = manifiesto or {}
+    nuevo_manifiesto = {}
+    secciones = {}
+    total = 0
+    directorios = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        raiz = pool.submit(escanear_directorio, ruta, ruta, manifiesto.get('.'))
+        pendientes = {raiz}
+        while pendientes:
+            if cancelado is not None and cancelado.is_set():
+                for futuro in pendientes:
+                    futuro.cancel()
+                return None
+            listos, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+            for futuro in listos:
+                seccion, lecciones, subdirectorios, entrada = futuro.result()
+                if futuro is raiz and entrada is None:
+                    raise OSError(f"No se pudo leer la carpeta del curso {ruta}")
+                directorios += 1
+                if entrada is not None:
+                    nuevo_manifiesto['.' if seccion == 'Principal' else seccion] = entrada
+                if lecciones:
+                    lecciones.sort(key=lambda leccion: clave_orden(leccion.nombre))
+                    secciones[seccion] = lecciones
+                    total += len(lecciones)
+                if progreso is not None:
+                    progreso(total, directorios, seccion)
+                for subdirectorio in subdirectorios:
+                    anterior = manifiesto.get(os.path.relpath(subdirectorio, ruta))
+                    pendientes.add(pool.submit(escanear_directorio, ruta, subdirectorio, anterior))
+
+        futuros = {}
+        for relativa, entrada in nuevo_manifiesto.items():
+            for nombre, huella in entrada.get("huellas", {}).items():
+                if huella[1] is None:
+                    ruta_archivo = os.path.join(ruta, relativa, nombre)
+                    futuros[pool.submit(huella_archivo, ruta_archivo, entrada["archivos"][nombre])] = huella
+        for futuro in as_completed(futuros):
+            if cancelado is not None and cancelado.is_set():
+                for pendiente in futuros:
+                    pendiente.cancel()
+                return None
+            futuros[futuro][1] = futuro.result()
+            if progreso is not None:
+                progreso(total, directorios, "Calculando huellas")
+
+    archivos = {seccion: secciones[seccion] for seccion in sorted(secciones, key=clave_orden)}
+    return total, archivos, nuevo_manifiesto
+
+
+def archivos_modificados(manifiesto, nuevo_manifiesto):
+    """Claves de las lecciones que siguen existiendo pero cambiaron de tamaño."""
+    modificados = set()
+    for relativa, entrada in nuevo_manifiesto.items():
+        anterior = manifiesto.get(relativa)
+        if anterior is None or anterior is entrada:
+            continue
+        seccion = 'Principal' if relativa == '.' else relativa
+        for nombre, tamano in entrada["archivos"].items():
+            if nombre in anterior["archivos"] and anterior["archivos"][nombre] != tamano:
+                modificados.add(clave_archivo(seccion, nombre))
+    return modificados
+
+
+def huellas_por_clave(manifiesto):
+    """{clave de lección: huella} a partir de un manifiesto de escaneo."""
+    huellas = {}
+    for relativa, entrada in manifiesto.items():
+        seccion = 'Principal' if relativa == '.' else relativa
+        for nombre, (mtime, huella) in entrada.get("huellas", {}).items():
+            if huella is not None:
+                huellas[clave_archivo(seccion, nombre)] = huella
+    return huellas
+
+
+def listar_cursos(ruta_raiz):
+    """Cada subcarpeta (no oculta) de la raíz es un curso: devuelve {nombre: ruta}."""
+    cursos = {}
+    with os.scandir(ruta_raiz) as entradas:
+        for entrada in entradas:
+            if not entrada.name.startswith('.') and entrada.is_dir():
+                cursos[entrada.name] = entrada.path
+    return {nombre: cursos[nombre] for nombre in sorted(cursos, key=clave_orden)}
+
+
+def escanear_biblioteca(cursos, max_cursos=4, curso_escaneado=None, cancelado=None):
+    """Escanea varios cursos a la vez en un pool de hilos.
+
+    Por cada curso llama a curso_escaneado(nombre, resultado, segundos, error)
+    en cuanto termina, con resultado None si falló.
+    """
+    def escanear(ruta):
+        inicio = time.perf_counter()
+        resultado = escanear_curso(ruta, cancelado=cancelado)
+        return resultado, time.perf_counter() - inicio
+
+    with ThreadPoolExecutor(max_workers=max_cursos) as pool:
+        futuros = {pool.submit(escanear, ruta): nombre for nombre, ruta in cursos.items()}
+        for futuro in as_completed(futuros):
+            if cancelado is not None and cancelado.is_set():
+                for pendiente in futuros:
+                    pendiente.cancel()
+                return False
+            nombre = futuros[futuro]
+            try:
+                resultado, segundos = futuro.result()
+            except Exception as e:
+                resultado, segundos, error = None, 0.0, str(e)
+            else:
+                error = "" if resultado is not None else "cancelado"
+            if curso_escaneado is not None:
+                curso_escaneado(nombre, resultado, segundos, error)
+    return True
+
+
+class ScanSignals(QObject):
+    progress = Signal(int, int, str)
+    finished = Signal(object)
+    cancelled = Signal()
+
+
+class ScanTask(QRunnable):
+    """Escanea la carpeta de un curso fuera del hilo de la interfaz."""
+
+    PROGRESS_INTERVAL = 0.05
+
+    def __init__(self, ruta, manifiesto=None):
+        super().__init__()
+        self.ruta = ruta
+        self.manifiesto = manifiesto
+        self.cancel_event = threading.Event()
+        self.signals = ScanSignals()
+        self.ultimo_progreso = 0
+
+    def emitir_progreso(self, archivos, directorios, seccion):
+        # Como mucho una señal cada PROGRESS_INTERVAL para no saturar la interfaz
+        ahora = time.monotonic()
+        if ahora - self.ultimo_progreso >= self.PROGRESS_INTERVAL:
+            self.ultimo_progreso = ahora
+            self.signals.progress.emit(archivos, directorios, seccion)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        try:
+            resultado = escanear_curso(self.ruta, self.manifiesto,
+                                       progreso=self.emitir_progreso,
+                                       cancelado=self.cancel_event)
+        except Exception as e:
+            print(f"Error escaneando {self.ruta}: {str(e)}")
+            resultado = None
+        if resultado is None:
+            self.signals.cancelled.emit()
+        else:
+            self.signals.finished.emit(resultado)
+
+
+class LibraryScanSignals(QObject):
+    courses_found = Signal(object)
+    course_scanned = Signal(str, object, float, str)
+    finished = Signal(bool)
+
+
+class LibraryScanTask(QRunnable):
+    """Importa en bloque todas las carpetas de curso de una raíz."""
+
+    def __init__(self, ruta_raiz, max_cursos=4):
+        super().__init__()
+        self.ruta_raiz = ruta_raiz
+        self.max_cursos = max_cursos
+        self.cancel_event = threading.Event()
+        self.signals = LibraryScanSignals()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        try:
+            cursos = listar_cursos(self.ruta_raiz)
+        except OSError as e:
+            print(f"No se pudo leer {self.ruta_raiz}: {str(e)}")
+            self.signals.finished.emit(False)
+            return
+        self.signals.courses_found.emit(cursos)
+        completo = escanear_biblioteca(cursos, self.max_cursos,
+                                       curso_escaneado=self.signals.course_scanned.emit,
+                                       cancelado=self.cancel_event)
+        self.signals.finished.emit(completo and not self.cancel_event.is_set())
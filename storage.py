@@ -0,0 +1,747 @@
+import os
+import sys
+import json
+import marshal
+import sqlite3
+import hashlib
+import threading
+from PySide6.QtCore import QTimer
+
+
+def clave_archivo(seccion, nombre):
+    # Clave estable de una lección: ruta relativa a la carpeta del curso con '/'
+    if seccion in ("Principal", "."):
+        return nombre
+    return seccion.replace(os.sep, "/") + "/" + nombre
+
+
+class Leccion:
+    """Lección de un curso con __slots__ en lugar de un dict por archivo.
+
+    Admite el acceso tipo dict (archivo['visto']) que usa el resto del código.
+    La sección se comparte entre las lecciones (sys.intern) y la clave 'id' se
+    calcula a partir de la sección y el nombre.
+    """
+
+    __slots__ = ("nombre", "tipo", "visto", "seccion")
+    CAMPOS = ("nombre", "tipo", "visto", "seccion", "id")
+
+    def __init__(self, nombre, tipo, visto, seccion):
+        self.nombre = nombre
+        self.tipo = sys.intern(tipo)
+        self.visto = bool(visto)
+        self.seccion = sys.intern(seccion)
+
+    @classmethod
+    def desde_dict(cls, datos, seccion):
+        return cls(datos["nombre"], datos["tipo"], datos.get("visto", False), seccion)
+
+    @property
+    def id(self):
+        return clave_archivo(self.seccion, self.nombre)
+
+    def __getitem__(self, campo):
+        if campo not in self.CAMPOS:
+            raise KeyError(campo)
+        return getattr(self, campo)
+
+    def __setitem__(self, campo, valor):
+        if campo not in self.__slots__:
+            raise KeyError(campo)
+        setattr(self, campo, valor)
+
+    def __contains__(self, campo):
+        return campo in self.CAMPOS
+
+    def get(self, campo, default=None):
+        return getattr(self, campo) if campo in self.CAMPOS else default
+
+    def keys(self):
+        return self.CAMPOS
+
+    def __repr__(self):
+        return f"Leccion({self.id!r}, visto={self.visto})"
+
+
+def crear_lecciones(archivos):
+    # {seccion: [dict]} leído de JSON -> {seccion: [Leccion]}
+    return {
+        sys.intern(seccion): [Leccion.desde_dict(archivo, seccion) for archivo in lista]
+        for seccion, lista in archivos.items()
+    }
+
+
+class JsonStorage:
+    """Guarda cursos y progreso en archivos JSON.
+
+    Cada curso tiene su propio archivo en cursos/ con su árbol de secciones y
+    un índice pequeño (cursos/index.json) guarda los resúmenes que necesita el
+    grid. Los árboles se leen solo al abrir el curso.
+
+    Las posiciones de video se añaden a un diario (una línea por cambio) que
+    se reproduce al arrancar y se compacta en segundo plano al crecer. Los
+    cambios solo marcan los archivos como sucios hasta flush().
+
+    Tras cada flush se escribe una instantánea binaria (marshal) con el índice
+    y el progreso; al arrancar se usa en lugar de los JSON si estos no han
+    cambiado desde entonces.
+    """
+
+    JOURNAL_MAX_BYTES = 256 * 1024
+    SNAPSHOT_VERSION = 1
+
+    def __init__(self, cursos_dir="cursos", progress_path="progress_data.json",
+                 journal_path="progress_journal.jsonl", cursos_path="cursos_data.json",
+                 snapshot_path="cursos_snapshot.bin"):
+        self.cursos_dir = cursos_dir
+        self.index_path = os.path.join(cursos_dir, "index.json")
+        # cursos_data.json monolítico de versiones anteriores, solo para migrar
+        self.cursos_path = cursos_path
+        self.progress_path = progress_path
+        self.journal_path = journal_path
+        self.snapshot_path = snapshot_path
+        self.snapshot_progress = None
+        self.journal = None
+        self.compaction_thread = None
+        self.index_dirty = False
+        self.shards_dirty = set()
+        self.cursos_data = {}
+        self.progress_data = {}
+
+    def cargar_cursos(self):
+        snapshot = self.leer_snapshot()
+        if snapshot is not None:
+            index = snapshot["index"]
+            self.snapshot_progress = snapshot["progress"]
+        else:
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    index = json.load(f)
+            except FileNotFoundError:
+                return self.migrar_cursos_data()
+
+        self.cursos_data = {}
+        for curso_name, resumen in index.items():
+            curso = dict(resumen)
+            curso["archivos"] = None
+            self.cursos_data[curso_name] = curso
+        return self.cursos_data
+
+    def migrar_cursos_data(self):
+        try:
+            with open(self.cursos_path, "r", encoding="utf-8") as f:
+                self.cursos_data = json.load(f)
+        except FileNotFoundError:
+            print(
+                f"No se encontró el archivo {self.index_path}. Iniciando con una lista de cursos vacía.")
+            self.cursos_data = {}
+            return self.cursos_data
+
+        # Se divide el archivo antiguo en un archivo por curso; el original se conserva
+        print(f"Migrando {self.cursos_path} a {self.cursos_dir}/")
+        for curso in self.cursos_data.values():
+            curso["archivos"] = crear_lecciones(curso.get("archivos") or {})
+        self.shards_dirty.update(self.cursos_data)
+        self.index_dirty = True
+        self.flush()
+        return self.cursos_data
+
+    def cargar_archivos(self, curso_name):
+        curso = self.cursos_data[curso_name]
+        if curso.get("archivos") is None:
+            try:
+                with open(self.get_shard_path(curso_name), "r", encoding="utf-8") as f:
+                    curso["archivos"] = crear_lecciones(json.load(f)["archivos"])
+            except FileNotFoundError:
+                print(f"No se encontró el archivo del curso {curso_name}")
+                curso["archivos"] = {}
+        return curso["archivos"]
+
+    def liberar_archivos(self, curso_name):
+        # Los árboles con cambios sin guardar se conservan hasta el próximo flush
+        curso = self.cursos_data.get(curso_name)
+        if curso is None or curso_name in self.shards_dirty:
+            return False
+        curso["archivos"] = None
+        return True
+
+    def cargar_todo(self):
+        self.cargar_cursos()
+        for curso_name in self.cursos_data:
+            self.cargar_archivos(curso_name)
+        return self.cursos_data
+
+    def get_shard_path(self, curso_name):
+        digest = hashlib.sha1(curso_name.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cursos_dir, f"{digest}.json")
+
+    def get_manifest_path(self, curso_name):
+        digest = hashlib.sha1(curso_name.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cursos_dir, f"{digest}.scan.json")
+
+    def cargar_manifiesto(self, curso_name):
+        try:
+            with open(self.get_manifest_path(curso_name), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def guardar_manifiesto(self, curso_name, manifiesto):
+        os.makedirs(self.cursos_dir, exist_ok=True)
+        self.write_json_atomic(
+            self.get_manifest_path(curso_name), manifiesto)
+
+    def guardar_index(self):
+        index = {
+            curso_name: {clave: valor for clave, valor in curso.items() if clave != "archivos"}
+            for curso_name, curso in self.cursos_data.items()
+        }
+        self.write_json_atomic(self.index_path, index, indent=2)
+        self.index_dirty = False
+
+    def guardar_shard(self, curso_name):
+        curso = self.cursos_data.get(curso_name)
+        if curso is None or curso.get("archivos") is None:
+            return
+        archivos = {seccion: [dict(archivo) for archivo in lista]
+                    for seccion, lista in curso["archivos"].items()}
+        self.write_json_atomic(self.get_shard_path(curso_name),
+                               {"id": curso_name, "archivos": archivos}, indent=2)
+        print(f"Datos del curso {curso_name} guardados")
+
+    def guardar_curso(self, curso_name):
+        self.shards_dirty.add(curso_name)
+        self.index_dirty = True
+
+    def guardar_resumen_curso(self, curso_name):
+        self.index_dirty = True
+
+    def guardar_archivo(self, curso_name, seccion, archivo):
+        self.shards_dirty.add(curso_name)
+        self.index_dirty = True
+
+    def load_progress_data(self):
+        if self.snapshot_progress is not None:
+            # La instantánea ya incluye el diario reproducido
+            self.progress_data = self.snapshot_progress
+            self.snapshot_progress = None
+            return self.progress_data
+        try:
+            with open(self.progress_path, "r", encoding="utf-8") as f:
+                self.progress_data = json.load(f)
+        except FileNotFoundError:
+            print(f"Archivo {self.progress_path} no encontrado. Creando uno nuevo.")
+            self.progress_data = {}
+            self.save_progress_data()
+
+        # Un diario .old queda si se cerró la aplicación a mitad de una compactación
+        for path in (self.journal_path + ".old", self.journal_path):
+            self.replay_journal(path)
+        return self.progress_data
+
+    def replay_journal(self, path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        curso_name, video_path, position, duration = json.loads(line)
+                    except ValueError:
+                        # Línea incompleta por un cierre inesperado: se ignora
+                        continue
+                    if position is None:
+                        # Entrada borrada (p. ej. la lección se movió a otra clave)
+                        self.progress_data.get(curso_name, {}).pop(video_path, None)
+                        continue
+                    self.progress_data.setdefault(curso_name, {})[video_path] = {
+                        "position": position,
+                        "duration": duration
+                    }
+        except FileNotFoundError:
+            pass
+
+    def save_video_progress(self, curso_name, video_path):
+        progress = self.progress_data[curso_name][video_path]
+        self.write_journal(
+            [curso_name, video_path, progress.get("position", 0), progress.get("duration", 0)])
+
+    def eliminar_progreso(self, curso_name, video_path):
+        # Ya se quitó de progress_data; el diario lo registra con posición nula
+        self.write_journal([curso_name, video_path, None, None])
+
+    def write_journal(self, entry):
+        if self.journal is None:
+            self.journal = open(self.journal_path, "a", encoding="utf-8")
+        self.journal.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    def flush(self):
+        if self.shards_dirty or self.index_dirty:
+            os.makedirs(self.cursos_dir, exist_ok=True)
+        for curso_name in self.shards_dirty:
+            self.guardar_shard(curso_name)
+        self.shards_dirty.clear()
+        if self.index_dirty:
+            self.guardar_index()
+        if self.journal is not None:
+            self.journal.flush()
+            if self.journal.tell() > self.JOURNAL_MAX_BYTES:
+                self.compact_progress()
+        self.escribir_snapshot()
+
+    def firmas_fuentes(self):
+        # Tamaño y mtime de cada JSON del que depende la instantánea
+        firmas = {}
+        for path in (self.index_path, self.cursos_path, self.progress_path,
+                     self.journal_path, self.journal_path + ".old"):
+            try:
+                st = os.stat(path)
+                firmas[path] = (st.st_size, st.st_mtime_ns)
+            except FileNotFoundError:
+                firmas[path] = None
+        return firmas
+
+    def escribir_snapshot(self):
+        if not self.cursos_data and not self.progress_data:
+            return
+        index = {
+            curso_name: {clave: valor for clave, valor in curso.items() if clave != "archivos"}
+            for curso_name, curso in self.cursos_data.items()
+        }
+        snapshot = {
+            "version": self.SNAPSHOT_VERSION,
+            "fuentes": self.firmas_fuentes(),
+            "index": index,
+            "progress": self.progress_data
+        }
+        try:
+            datos = marshal.dumps(snapshot)
+            tmp_path = self.snapshot_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(datos)
+            os.replace(tmp_path, self.snapshot_path)
+        except (OSError, ValueError) as e:
+            print(f"No se pudo escribir {self.snapshot_path}: {str(e)}")
+
+    def leer_snapshot(self):
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                snapshot = marshal.loads(f.read())
+        except FileNotFoundError:
+            return None
+        except (EOFError, ValueError, TypeError) as e:
+            print(f"Instantánea {self.snapshot_path} dañada, se leen los JSON: {str(e)}")
+            return None
+        if not isinstance(snapshot, dict) or snapshot.get("version") != self.SNAPSHOT_VERSION:
+            return None
+        if snapshot.get("fuentes") != self.firmas_fuentes():
+            # Los JSON cambiaron desde la última instantánea
+            return None
+        return snapshot
+
+    def compact_progress(self):
+        if self.compaction_thread is not None and self.compaction_thread.is_alive():
+            return
+        # Se rota el diario y se escribe una copia del estado actual en otro hilo
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        old_path = self.journal_path + ".old"
+        if os.path.exists(old_path):
+            # Quedó de una compactación interrumpida: el diario se añade a él y
+            # la copia de progress_data (que ya lo incluye) lo sustituye entero
+            self.append_journal(self.journal_path, old_path)
+            os.remove(self.journal_path)
+        else:
+            os.replace(self.journal_path, old_path)
+        snapshot = {curso: dict(progresos) for curso, progresos in self.progress_data.items()}
+        self.compaction_thread = threading.Thread(
+            target=self.write_progress_snapshot, args=(snapshot,), daemon=True)
+        self.compaction_thread.start()
+
+    def append_journal(self, origen, destino):
+        # Una línea final incompleta no debe pegarse a la primera añadida
+        incompleta = False
+        if os.path.getsize(destino) > 0:
+            with open(destino, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                incompleta = f.read(1) != b"\n"
+        with open(origen, "rb") as f_origen, open(destino, "ab") as f_destino:
+            if incompleta:
+                f_destino.write(b"\n")
+            f_destino.write(f_origen.read())
+
+    def write_progress_snapshot(self, snapshot):
+        try:
+            self.write_json_atomic(self.progress_path, snapshot)
+            os.remove(self.journal_path + ".old")
+        except OSError as e:
+            print(f"Error compactando {self.journal_path}: {str(e)}")
+
+    def write_json_atomic(self, path, data, indent=None):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def save_progress_data(self):
+        self.write_json_atomic(self.progress_path, self.progress_data, indent=2)
+
+    def reemplazar_progreso(self):
+        # Reescribe todo el progreso (p. ej. tras migrar claves) y descarta el diario
+        if self.compaction_thread is not None:
+            self.compaction_thread.join()
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        self.save_progress_data()
+        for path in (self.journal_path, self.journal_path + ".old"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def close(self):
+        self.flush()
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        if self.compaction_thread is not None:
+            self.compaction_thread.join()
+
+
+class SQLiteStorage:
+    """Guarda cursos, secciones, lecciones y progreso en SQLite (modo WAL).
+
+    Cada cambio es un upsert de una sola fila en lugar de reescribir todo. Al
+    arrancar solo se leen los resúmenes; las lecciones se consultan al abrir
+    el curso.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS cursos (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            description TEXT,
+            icon TEXT,
+            ruta TEXT,
+            total_archivos INTEGER NOT NULL DEFAULT 0,
+            archivos_vistos INTEGER NOT NULL DEFAULT 0,
+            orden INTEGER NOT NULL DEFAULT 0,
+            duracion_total INTEGER,
+            duracion_vista INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS secciones (
+            curso_id TEXT NOT NULL REFERENCES cursos(id) ON DELETE CASCADE,
+            nombre TEXT NOT NULL,
+            orden INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (curso_id, nombre)
+        );
+        CREATE TABLE IF NOT EXISTS archivos (
+            curso_id TEXT NOT NULL,
+            seccion TEXT NOT NULL,
+            nombre TEXT NOT NULL,
+            tipo TEXT NOT NULL,
+            visto INTEGER NOT NULL DEFAULT 0,
+            orden INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (curso_id, seccion, nombre),
+            FOREIGN KEY (curso_id, seccion) REFERENCES secciones(curso_id, nombre) ON DELETE CASCADE
+        );
+        CREATE TABLE IF NOT EXISTS progreso (
+            curso_id TEXT NOT NULL,
+            ruta TEXT NOT NULL,
+            position INTEGER NOT NULL DEFAULT 0,
+            duration INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (curso_id, ruta)
+        );
+        CREATE TABLE IF NOT EXISTS escaneos (
+            curso_id TEXT PRIMARY KEY REFERENCES cursos(id) ON DELETE CASCADE,
+            manifiesto TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            clave TEXT PRIMARY KEY,
+            valor TEXT
+        );
+    """
+
+    def __init__(self, db_path="cursos.db", cursos_path="cursos_data.json",
+                 progress_path="progress_data.json"):
+        self.db_path = db_path
+        self.cursos_path = cursos_path
+        self.progress_path = progress_path
+        self.cursos_data = {}
+        self.progress_data = {}
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(self.SCHEMA)
+        self.migrar_esquema()
+        self.importar_json()
+
+    def migrar_esquema(self):
+        # Columnas añadidas después de crear la base de datos
+        columnas = {row[1] for row in self.conn.execute("PRAGMA table_info(cursos)")}
+        for columna in ("duracion_total", "duracion_vista"):
+            if columna not in columnas:
+                self.conn.execute(f"ALTER TABLE cursos ADD COLUMN {columna} INTEGER")
+        self.conn.commit()
+
+    def importar_json(self):
+        # Importación única desde los archivos JSON existentes
+        if self.conn.execute("SELECT valor FROM meta WHERE clave = 'importado'").fetchone():
+            return
+
+        # Se leen los cursos y el diario pendiente a través de JsonStorage
+        fuente = JsonStorage(progress_path=self.progress_path, cursos_path=self.cursos_path)
+        cursos_data = fuente.cargar_todo()
+        fuente.progress_data = self.leer_json(self.progress_path)
+        for path in (fuente.journal_path + ".old", fuente.journal_path):
+            fuente.replay_journal(path)
+        progress_data = fuente.progress_data
+        with self.conn:
+            for orden, curso_name in enumerate(cursos_data):
+                self.insertar_curso(cursos_data[curso_name], orden)
+            for curso_name, progresos in progress_data.items():
+                for video_path, progress in progresos.items():
+                    self.upsert_progreso(curso_name, video_path, progress)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (clave, valor) VALUES ('importado', '1')")
+        if cursos_data or progress_data:
+            print(f"Importados {len(cursos_data)} cursos a {self.db_path}")
+
+    def leer_json(self, path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            print(f"No se pudo importar {path}: {str(e)}")
+            return {}
+
+    def cargar_cursos(self):
+        self.cursos_data = {}
+        for row in self.conn.execute(
+                "SELECT id, name, description, icon, ruta, total_archivos, archivos_vistos, "
+                "duracion_total, duracion_vista FROM cursos ORDER BY orden"):
+            curso_id, name, description, icon, ruta, total, vistos, duracion_total, duracion_vista = row
+            curso = self.cursos_data[curso_id] = {
+                "id": curso_id,
+                "name": name,
+                "description": description,
+                "totalArchivos": total,
+                "archivosVistos": vistos,
+                "icon": icon,
+                "archivos": None,
+                "progress": {},
+                "ruta": ruta
+            }
+            if duracion_total is not None:
+                curso["duracionTotal"] = duracion_total
+                curso["duracionVista"] = duracion_vista or 0
+        return self.cursos_data
+
+    def cargar_archivos(self, curso_name):
+        curso = self.cursos_data[curso_name]
+        if curso.get("archivos") is None:
+            archivos = {}
+            for (seccion,) in self.conn.execute(
+                    "SELECT nombre FROM secciones WHERE curso_id = ? ORDER BY orden", (curso_name,)):
+                archivos[sys.intern(seccion)] = []
+            for seccion, nombre, tipo, visto in self.conn.execute(
+                    "SELECT seccion, nombre, tipo, visto FROM archivos WHERE curso_id = ? "
+                    "ORDER BY seccion, orden", (curso_name,)):
+                if seccion in archivos:
+                    archivos[seccion].append(Leccion(nombre, tipo, visto, seccion))
+            curso["archivos"] = archivos
+        return curso["archivos"]
+
+    def liberar_archivos(self, curso_name):
+        # Los cambios ya están en la conexión; el árbol se vuelve a leer al abrir
+        curso = self.cursos_data.get(curso_name)
+        if curso is None:
+            return False
+        curso["archivos"] = None
+        return True
+
+    def insertar_curso(self, curso, orden):
+        self.conn.execute(
+            "INSERT INTO cursos (id, name, description, icon, ruta, total_archivos, archivos_vistos, orden) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET name = excluded.name, description = excluded.description, "
+            "icon = excluded.icon, ruta = excluded.ruta, total_archivos = excluded.total_archivos, "
+            "archivos_vistos = excluded.archivos_vistos",
+            (curso["id"], curso["name"], curso.get("description"), curso.get("icon"),
+             curso.get("ruta"), curso.get("totalArchivos", 0), curso.get("archivosVistos", 0), orden))
+        if curso.get("archivos") is None:
+            # Árbol no cargado: las secciones guardadas siguen siendo válidas
+            return
+        self.conn.execute("DELETE FROM secciones WHERE curso_id = ?", (curso["id"],))
+        for orden_seccion, (seccion, archivos) in enumerate(curso["archivos"].items()):
+            self.conn.execute(
+                "INSERT INTO secciones (curso_id, nombre, orden) VALUES (?, ?, ?)",
+                (curso["id"], seccion, orden_seccion))
+            self.conn.executemany(
+                "INSERT INTO archivos (curso_id, seccion, nombre, tipo, visto, orden) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(curso["id"], seccion, archivo["nombre"], archivo["tipo"], int(archivo["visto"]), i)
+                 for i, archivo in enumerate(archivos)])
+
+    def guardar_curso(self, curso_name):
+        orden = self.conn.execute(
+            "SELECT COALESCE(MAX(orden) + 1, 0) FROM cursos").fetchone()[0]
+        self.insertar_curso(self.cursos_data[curso_name], orden)
+
+    def guardar_resumen_curso(self, curso_name):
+        curso = self.cursos_data[curso_name]
+        self.conn.execute(
+            "UPDATE cursos SET name = ?, icon = ?, total_archivos = ?, archivos_vistos = ?, "
+            "duracion_total = ?, duracion_vista = ? WHERE id = ?",
+            (curso["name"], curso["icon"], curso["totalArchivos"], curso["archivosVistos"],
+             curso.get("duracionTotal"), curso.get("duracionVista"), curso_name))
+
+    def guardar_archivo(self, curso_name, seccion, archivo):
+        self.conn.execute(
+            "UPDATE archivos SET visto = ? WHERE curso_id = ? AND seccion = ? AND nombre = ?",
+            (int(archivo["visto"]), curso_name, seccion, archivo["nombre"]))
+        self.conn.execute(
+            "UPDATE cursos SET archivos_vistos = ? WHERE id = ?",
+            (self.cursos_data[curso_name]["archivosVistos"], curso_name))
+
+    def cargar_manifiesto(self, curso_name):
+        row = self.conn.execute(
+            "SELECT manifiesto FROM escaneos WHERE curso_id = ?", (curso_name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def guardar_manifiesto(self, curso_name, manifiesto):
+        self.conn.execute(
+            "INSERT INTO escaneos (curso_id, manifiesto) VALUES (?, ?) "
+            "ON CONFLICT(curso_id) DO UPDATE SET manifiesto = excluded.manifiesto",
+            (curso_name, json.dumps(manifiesto, ensure_ascii=False)))
+
+    def load_progress_data(self):
+        self.progress_data = {}
+        for curso_id, ruta, position, duration in self.conn.execute(
+                "SELECT curso_id, ruta, position, duration FROM progreso"):
+            self.progress_data.setdefault(curso_id, {})[ruta] = {
+                "position": position,
+                "duration": duration
+            }
+        return self.progress_data
+
+    def upsert_progreso(self, curso_name, video_path, progress):
+        self.conn.execute(
+            "INSERT INTO progreso (curso_id, ruta, position, duration) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(curso_id, ruta) DO UPDATE SET position = excluded.position, "
+            "duration = excluded.duration",
+            (curso_name, video_path, progress.get("position", 0), progress.get("duration", 0)))
+
+    def save_video_progress(self, curso_name, video_path):
+        self.upsert_progreso(
+            curso_name, video_path, self.progress_data[curso_name][video_path])
+
+    def eliminar_progreso(self, curso_name, video_path):
+        self.conn.execute(
+            "DELETE FROM progreso WHERE curso_id = ? AND ruta = ?", (curso_name, video_path))
+
+    def reemplazar_progreso(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM progreso")
+            for curso_name, progresos in self.progress_data.items():
+                for video_path, progress in progresos.items():
+                    self.upsert_progreso(curso_name, video_path, progress)
+
+    def flush(self):
+        # Todos los upserts pendientes se confirman en una sola transacción
+        self.conn.commit()
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+
+class WriteBehindStorage:
+    """Agrupa los cambios y los escribe en un solo flush por ventana de tiempo."""
+
+    def __init__(self, storage, window_ms=500):
+        self.storage = storage
+        self.mutations = 0
+        self.flushes = 0
+        self.dirty = False
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(window_ms)
+        self.timer.timeout.connect(self.flush)
+
+    @property
+    def writes_saved(self):
+        return self.mutations - self.flushes
+
+    def cargar_cursos(self):
+        return self.storage.cargar_cursos()
+
+    def cargar_archivos(self, curso_name):
+        return self.storage.cargar_archivos(curso_name)
+
+    def liberar_archivos(self, curso_name):
+        return self.storage.liberar_archivos(curso_name)
+
+    def load_progress_data(self):
+        return self.storage.load_progress_data()
+
+    def guardar_curso(self, curso_name):
+        self.storage.guardar_curso(curso_name)
+        self.mark_dirty()
+
+    def guardar_resumen_curso(self, curso_name):
+        self.storage.guardar_resumen_curso(curso_name)
+        self.mark_dirty()
+
+    def guardar_archivo(self, curso_name, seccion, archivo):
+        self.storage.guardar_archivo(curso_name, seccion, archivo)
+        self.mark_dirty()
+
+    def save_video_progress(self, curso_name, video_path):
+        self.storage.save_video_progress(curso_name, video_path)
+        self.mark_dirty()
+
+    def eliminar_progreso(self, curso_name, video_path):
+        self.storage.eliminar_progreso(curso_name, video_path)
+        self.mark_dirty()
+
+    def cargar_manifiesto(self, curso_name):
+        return self.storage.cargar_manifiesto(curso_name)
+
+    def guardar_manifiesto(self, curso_name, manifiesto):
+        self.storage.guardar_manifiesto(curso_name, manifiesto)
+        self.mark_dirty()
+
+    def reemplazar_progreso(self):
+        self.storage.reemplazar_progreso()
+
+    def mark_dirty(self):
+        self.mutations += 1
+        self.dirty = True
+        # No se reinicia el temporizador: el retraso máximo es una ventana
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def flush(self):
+        self.timer.stop()
+        if not self.dirty:
+            return
+        self.dirty = False
+        self.storage.flush()
+        self.flushes += 1
+
+    def close(self):
+        self.flush()
+        self.storage.close()
+        print(f"Escrituras ahorradas por agrupación: {self.writes_saved} de {self.mutations}")
+
+
+def crear_storage(window_ms=500):
+    # CURSOTRACKER_STORAGE=sqlite usa cursos.db; por defecto se mantienen los JSON
+    backend = os.environ.get("CURSOTRACKER_STORAGE", "json").lower()
+    if backend == "sqlite":
+        return WriteBehindStorage(SQLiteStorage(), window_ms)
+    return WriteBehindStorage(JsonStorage(), window_ms)
@@ -0,0 +1,314 @@
+import os
+import json
+import math
+import hashlib
+from collections import OrderedDict, deque
+from PySide6.QtCore import QObject, QThread, QTimer, QUrl, QRect, Qt, Signal
+from PySide6.QtGui import QImage, QPainter, QPixmap
+from PySide6.QtMultimedia import QMediaPlayer, QVideoSink
+
+POSTER_SIZE = (320, 180)
+TILE_SIZE = (160, 90)
+SPRITE_COLUMNS = 10
+MAX_TILES = 100
+MIN_TILE_INTERVAL_MS = 10000
+
+
+class ThumbnailCache:
+    """Carátulas y hojas de miniaturas en disco, con un límite de bytes.
+
+    Cada video se guarda por (ruta, tamaño, mtime) como <clave>.poster.jpg,
+    <clave>.sprite.jpg y <clave>.json. Al superar max_bytes se borran los
+    archivos usados hace más tiempo.
+    """
+
+    def __init__(self, cache_dir="thumb_cache", max_bytes=256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.total_bytes = None
+
+    def get_key(self, ruta):
+        try:
+            st = os.stat(ruta)
+        except OSError:
+            return None
+        firma = f"{os.path.normpath(ruta)}|{st.st_size}|{st.st_mtime_ns}"
+        return hashlib.sha1(firma.encode("utf-8")).hexdigest()[:20]
+
+    def get_path(self, key, tipo):
+        extension = "json" if tipo == "meta" else f"{tipo}.jpg"
+        return os.path.join(self.cache_dir, f"{key}.{extension}")
+
+    def load(self, key, con_sprite):
+        # Devuelve (poster, sprite, meta) o None si no está en cache
+        try:
+            with open(self.get_path(key, "meta"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        poster = QImage(self.get_path(key, "poster"))
+        sprite = QImage(self.get_path(key, "sprite")) if con_sprite else QImage()
+        if poster.isNull() or (con_sprite and sprite.isNull()):
+            return None
+        # Se actualiza el mtime para que el límite de tamaño borre primero lo no usado
+        for tipo in ("meta", "poster", "sprite"):
+            try:
+                os.utime(self.get_path(key, tipo))
+            except OSError:
+                pass
+        return poster, sprite, meta
+
+    def store(self, key, poster, sprite, meta):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        poster.save(self.get_path(key, "poster"), "JPG", 80)
+        if not sprite.isNull():
+            sprite.save(self.get_path(key, "sprite"), "JPG", 70)
+        # El .json se escribe al final: marca la entrada como completa
+        with open(self.get_path(key, "meta"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        self.enforce_limit(key)
+
+    def enforce_limit(self, key_reciente=None):
+        try:
+            entradas = [entrada for entrada in os.scandir(self.cache_dir) if entrada.is_file()]
+        except FileNotFoundError:
+            return
+        archivos = [(entrada.stat().st_mtime, entrada.stat().st_size, entrada.path) for entrada in entradas]
+        self.total_bytes = sum(tamano for _, tamano, _ in archivos)
+        if self.total_bytes <= self.max_bytes:
+            return
+        for _, tamano, ruta in sorted(archivos):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if key_reciente and os.path.basename(ruta).startswith(key_reciente):
+                continue
+            try:
+                os.remove(ruta)
+                self.total_bytes -= tamano
+            except OSError:
+                pass
+
+
+class ThumbnailWorker(QObject):
+    """Extrae los cuadros con un QMediaPlayer sin ventana en su propio hilo.
+
+    Para la hoja de miniaturas se salta a intervalos fijos y se guarda el
+    primer cuadro que llega tras cada salto; para una carátula sola basta un
+    salto. El decodificado y el escalado nunca ocurren en el hilo de la
+    interfaz.
+    """
+
+    ready = Signal(str, QImage, QImage, object)
+    failed = Signal(str)
+
+    # Tiempo máximo para abrir el video o para recibir cada cuadro pedido
+    TIMEOUT_MS = 20000
+
+    def __init__(self, cache):
+        super().__init__()
+        self.cache = cache
+        self.cola = deque()
+        self.actual = None
+
+    def iniciar(self):
+        # Se ejecuta ya dentro del hilo del worker
+        self.sink = QVideoSink(self)
+        self.sink.videoFrameChanged.connect(self.on_frame)
+        self.player = QMediaPlayer(self)
+        self.player.setVideoSink(self.sink)
+        self.player.mediaStatusChanged.connect(self.on_media_status)
+        self.player.errorOccurred.connect(lambda *args: self.terminar_actual(False))
+        self.timeout = QTimer(self)
+        self.timeout.setSingleShot(True)
+        self.timeout.setInterval(self.TIMEOUT_MS)
+        self.timeout.timeout.connect(lambda: self.terminar_actual(False))
+
+    def solicitar(self, ruta, con_sprite):
+        if con_sprite:
+            # El video en reproducción va antes que las carátulas de la lista
+            self.cola.appendleft((ruta, True))
+        else:
+            self.cola.append((ruta, False))
+        self.iniciar_siguiente()
+
+    def iniciar_siguiente(self):
+        while self.actual is None and self.cola:
+            ruta, con_sprite = self.cola.popleft()
+            key = self.cache.get_key(ruta)
+            if key is None:
+                self.failed.emit(ruta)
+                continue
+            cacheado = self.cache.load(key, con_sprite)
+            if cacheado is not None:
+                poster, sprite, meta = cacheado
+                self.ready.emit(ruta, poster, sprite, meta)
+                continue
+            self.actual = {"ruta": ruta, "key": key, "con_sprite": con_sprite,
+                           "tiempos": [], "cuadros": [], "objetivo": 0}
+            self.timeout.start()
+            self.player.setSource(QUrl.fromLocalFile(ruta))
+
+    def on_media_status(self, status):
+        if self.actual is None:
+            return
+        if status == QMediaPlayer.InvalidMedia:
+            self.terminar_actual(False)
+        elif status == QMediaPlayer.LoadedMedia and not self.actual["tiempos"]:
+            duracion = max(self.player.duration(), 0)
+            if self.actual["con_sprite"]:
+                cantidad = max(1, min(MAX_TILES, duracion // MIN_TILE_INTERVAL_MS))
+                intervalo = duracion / cantidad if duracion else 0
+                self.actual["tiempos"] = [int(intervalo * i + intervalo / 2) for i in range(cantidad)]
+            else:
+                # Solo la carátula: un cuadro hacia el 10% del video
+                intervalo = min(duracion, MIN_TILE_INTERVAL_MS)
+                self.actual["tiempos"] = [duracion // 10]
+            self.actual["intervalo"] = intervalo
+            self.player.play()
+            self.pedir_cuadro()
+
+    def pedir_cuadro(self):
+        objetivo = self.actual["tiempos"][len(self.actual["cuadros"])]
+        self.actual["objetivo"] = objetivo
+        self.timeout.start()
+        self.player.setPosition(objetivo)
+
+    def on_frame(self, frame):
+        if self.actual is None or not self.actual["tiempos"] or not frame.isValid():
+            return
+        # Se descartan los cuadros que llegan de antes del salto
+        inicio_ms = frame.startTime() // 1000
+        if inicio_ms >= 0 and inicio_ms < self.actual["objetivo"] - self.actual["intervalo"] / 2:
+            return
+        imagen = frame.toImage()
+        if imagen.isNull():
+            return
+        self.actual["cuadros"].append(imagen.scaled(
+            POSTER_SIZE[0], POSTER_SIZE[1], Qt.KeepAspectRatio, Qt.SmoothTransformation))
+        if len(self.actual["cuadros"]) < len(self.actual["tiempos"]):
+            self.pedir_cuadro()
+        else:
+            self.terminar_actual(True)
+
+    def terminar_actual(self, ok):
+        if self.actual is None:
+            return
+        actual = self.actual
+        self.actual = None
+        self.timeout.stop()
+        self.player.stop()
+        self.player.setSource(QUrl())
+        if ok:
+            poster, sprite, meta = self.componer(actual)
+            try:
+                self.cache.store(actual["key"], poster, sprite, meta)
+            except OSError as e:
+                print(f"Error guardando miniaturas de {actual['ruta']}: {str(e)}")
+            self.ready.emit(actual["ruta"], poster, sprite, meta)
+        else:
+            print(f"No se pudieron generar miniaturas de {actual['ruta']}")
+            self.failed.emit(actual["ruta"])
+        self.iniciar_siguiente()
+
+    def componer(self, actual):
+        cuadros = actual["cuadros"]
+        # La carátula es un cuadro hacia el 10% del video, para evitar negros iniciales
+        poster = cuadros[len(cuadros) // 10]
+        if not actual["con_sprite"]:
+            return poster, QImage(), {"intervalo": 0, "cantidad": 0}
+        filas = math.ceil(len(cuadros) / SPRITE_COLUMNS)
+        columnas = min(len(cuadros), SPRITE_COLUMNS)
+        sprite = QImage(columnas * TILE_SIZE[0], filas * TILE_SIZE[1], QImage.Format_RGB32)
+        sprite.fill(Qt.black)
+        painter = QPainter(sprite)
+        for i, cuadro in enumerate(cuadros):
+            tile = cuadro.scaled(TILE_SIZE[0], TILE_SIZE[1], Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            x = (i % SPRITE_COLUMNS) * TILE_SIZE[0] + (TILE_SIZE[0] - tile.width()) // 2
+            y = (i // SPRITE_COLUMNS) * TILE_SIZE[1] + (TILE_SIZE[1] - tile.height()) // 2
+            painter.drawImage(x, y, tile)
+        painter.end()
+        meta = {
+            "intervalo": actual["intervalo"],
+            "cantidad": len(cuadros),
+            "columnas": SPRITE_COLUMNS,
+            "tile": list(TILE_SIZE)
+        }
+        return poster, sprite, meta
+
+
+class ThumbnailManager(QObject):
+    """Sirve carátulas y vistas previas ya generadas; pide al worker las que faltan."""
+
+    thumbnail_ready = Signal(str)
+    solicitud = Signal(str, bool)
+
+    def __init__(self, parent=None, cache_dir="thumb_cache", max_bytes=256 * 1024 * 1024,
+                 max_posters=512, max_sprites=4):
+        super().__init__(parent)
+        self.max_posters = max_posters
+        self.max_sprites = max_sprites
+        self.posters = OrderedDict()
+        self.sprites = OrderedDict()
+        self.pendientes = set()
+        self.fallidos = set()
+        self.thread = QThread(self)
+        self.worker = ThumbnailWorker(ThumbnailCache(cache_dir, max_bytes))
+        self.worker.moveToThread(self.thread)
+        self.thread.started.connect(self.worker.iniciar)
+        # El reproductor y el temporizador se destruyen en el hilo que los creó
+        self.thread.finished.connect(self.worker.deleteLater)
+        self.solicitud.connect(self.worker.solicitar)
+        self.worker.ready.connect(self.on_ready)
+        self.worker.failed.connect(self.on_failed)
+        self.thread.start()
+
+    def request(self, ruta, con_sprite=False):
+        clave = (ruta, con_sprite)
+        if clave in self.pendientes or ruta in self.fallidos:
+            return
+        self.pendientes.add(clave)
+        self.solicitud.emit(ruta, con_sprite)
+
+    def poster(self, ruta):
+        pixmap = self.posters.get(ruta)
+        if pixmap is not None:
+            self.posters.move_to_end(ruta)
+            return pixmap
+        self.request(ruta)
+        return None
+
+    def preview(self, ruta, position_ms):
+        entrada = self.sprites.get(ruta)
+        if entrada is None:
+            self.request(ruta, con_sprite=True)
+            return None
+        sprite, meta = entrada
+        intervalo = meta["intervalo"] or 1
+        indice = min(meta["cantidad"] - 1, max(0, int(position_ms // intervalo)))
+        ancho, alto = meta["tile"]
+        rect = QRect((indice % meta["columnas"]) * ancho, (indice // meta["columnas"]) * alto, ancho, alto)
+        return QPixmap.fromImage(sprite.copy(rect))
+
+    def on_ready(self, ruta, poster, sprite, meta):
+        self.pendientes.discard((ruta, False))
+        if not poster.isNull():
+            self.posters[ruta] = QPixmap.fromImage(poster)
+            self.posters.move_to_end(ruta)
+            while len(self.posters) > self.max_posters:
+                self.posters.popitem(last=False)
+        if not sprite.isNull():
+            self.pendientes.discard((ruta, True))
+            self.sprites[ruta] = (sprite, meta)
+            self.sprites.move_to_end(ruta)
+            while len(self.sprites) > self.max_sprites:
+                self.sprites.popitem(last=False)
+        self.thumbnail_ready.emit(ruta)
+
+    def on_failed(self, ruta):
+        self.pendientes.discard((ruta, False))
+        self.pendientes.discard((ruta, True))
+        self.fallidos.add(ruta)
+
+    def close(self):
+        self.thread.quit()
+        self.thread.wait()